@@ -27,6 +27,11 @@ TA_TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "Reporte_TAs_template.xls
 AP_AR_TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "AP Y AR LLC.xlsx")
 COM_PEND_PROV_TEMPLATE_PATH = os.path.join(BASE_DIR, "templates", "Comisiones Pendientes Prov.xlsx")
 
+# Cache en disco de las últimas tasas FX (una descarga por día)
+FX_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "gannet_fx.json")
+# Cache en disco de las tasas históricas por mes (meses cerrados no caducan)
+FX_MONTHS_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "gannet_fx_months.json")
+
 # ── Fallback FX rates ─────────────────────────────────────────────────────
 FALLBACK_FX = {
     "EUR": {"EUR": 1.0, "USD": 1.16},
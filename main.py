@@ -157,10 +157,7 @@ def _run_bookings(all_data_rows, output_dir, week_num, today):
     print(f"{'─' * 60}")
 
     bookings_path = os.path.join(output_dir, f"Bookings_ALL_{week_num}_{today.year}.xlsx")
-    combined_matrix = build_booking_matrix(all_data_rows)
-    from openpyxl import Workbook
-    from src.bookings import export_bookings_xlsx as _export
-    _export(all_data_rows, bookings_path, "ALL")
+    export_bookings_xlsx(all_data_rows, bookings_path, "ALL")
     print(f"  Bookings combinado: {bookings_path}")
 
 
@@ -77,15 +77,31 @@ def _load_payment_csv(data_dir, filename):
     return df
 
 
+def _iter_columns(df, required, defaults):
+    """Itera tuplas (required..., defaults...) por fila de df.
+
+    Las columnas de `defaults` que no existan en df toman su valor por
+    defecto en todas las filas; las de `required` deben existir.
+    """
+    data = {col: df[col] for col in required}
+    for col, default in defaults.items():
+        data[col] = df[col] if col in df else default
+    return pd.DataFrame(data, index=df.index).itertuples(index=False, name=None)
+
+
 # ── Lookup de reserva ────────────────────────────────────────────────────
 
 def _build_reserva_lookup(reserva_df):
     """Crea {folio: {moneda, fecha_inicio, total_proveedor, total_cliente}}."""
+    defaults = {
+        "moneda": "EUR", "fecha_inicio": None,
+        "total_proveedor": 0, "total_cliente": 0,
+    }
     lookup = {}
-    for _, r in reserva_df.iterrows():
-        folio = r["folio"]
-        moneda = str(r.get("moneda", "EUR")).strip()
-        fecha_inicio = r.get("fecha_inicio")
+    for folio, moneda, fecha_inicio, total_prov, total_cli in (
+        _iter_columns(reserva_df, ["folio"], defaults)
+    ):
+        moneda = str(moneda).strip()
         if pd.notna(fecha_inicio):
             if isinstance(fecha_inicio, str):
                 try:
@@ -95,10 +111,8 @@ def _build_reserva_lookup(reserva_df):
         else:
             fecha_inicio = None
 
-        total_prov = r.get("total_proveedor", 0)
         if pd.isna(total_prov):
             total_prov = 0
-        total_cli = r.get("total_cliente", 0)
         if pd.isna(total_cli):
             total_cli = 0
 
@@ -165,8 +179,10 @@ def _build_4zp_records(pago_cli_df):
         (pago_cli_df["forma_pago"] == "4ZP")
     ]
     return [
-        (row["reserva"], row["monto"], str(row.get("moneda", "MXN")).strip())
-        for _, row in filtered.iterrows()
+        (reserva, monto, str(moneda).strip())
+        for reserva, monto, moneda in _iter_columns(
+            filtered, ["reserva", "monto"], {"moneda": "MXN"}
+        )
     ]
 
 
@@ -396,15 +412,15 @@ def _load_proveedor_lookup(data_dir):
     if not path:
         return {}
     df = pd.read_csv(path, encoding="latin-1")
+    defaults = {"clave": None, "nombre": "", "correo_e_contacto": "", "ciudad": ""}
     lookup = {}
-    for _, r in df.iterrows():
-        clave = r.get("clave")
+    for clave, nombre, email, ciudad in _iter_columns(df, [], defaults):
         if pd.isna(clave):
             continue
         lookup[int(clave)] = {
-            "nombre": str(r.get("nombre", "")).strip() if pd.notna(r.get("nombre")) else "",
-            "email": str(r.get("correo_e_contacto", "")).strip() if pd.notna(r.get("correo_e_contacto")) else "",
-            "ciudad": str(r.get("ciudad", "")).strip() if pd.notna(r.get("ciudad")) else "",
+            "nombre": str(nombre).strip() if pd.notna(nombre) else "",
+            "email": str(email).strip() if pd.notna(email) else "",
+            "ciudad": str(ciudad).strip() if pd.notna(ciudad) else "",
         }
     return lookup
 
@@ -426,8 +442,10 @@ def _build_alertas_data(pago_prov_df, prov_lookup):
     proximos = []
     excedidos = []
 
-    for _, row in unpaid.iterrows():
-        fl = row["fecha_limite_dt"]
+    defaults = {"vendedor": "", "fecha": "", "proveedor": None, "monto": 0}
+    for reserva, fl, vendedor, fecha, prov_code, monto in (
+        _iter_columns(unpaid, ["reserva", "fecha_limite_dt"], defaults)
+    ):
         if pd.isna(fl):
             continue
         fl_date = fl.date()
@@ -436,19 +454,18 @@ def _build_alertas_data(pago_prov_df, prov_lookup):
         if days_remaining > 7:
             continue
 
-        prov_code = row.get("proveedor", "")
         prov_info = prov_lookup.get(int(prov_code), {}) if pd.notna(prov_code) else {}
 
         record = {
-            "reserva": row["reserva"],
-            "vendedor": str(row.get("vendedor", "")),
-            "fecha": str(row.get("fecha", "")),
+            "reserva": reserva,
+            "vendedor": str(vendedor),
+            "fecha": str(fecha),
             "proveedor_code": prov_code,
             "proveedor_nombre": prov_info.get("nombre", ""),
             "proveedor_email": prov_info.get("email", ""),
             "proveedor_ciudad": prov_info.get("ciudad", ""),
             "fecha_limite": fl_date,
-            "monto": row.get("monto", 0),
+            "monto": monto,
         }
 
         if days_remaining < 0:
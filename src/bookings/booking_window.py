@@ -6,6 +6,7 @@ y añade los datos nuevos de la semana actual.
 """
 
 import os
+from operator import itemgetter
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
@@ -14,6 +15,7 @@ from config import MONTH_NAMES_ES
 
 # USD format matching the template
 USD_FMT = '[$$-409]#,##0'
+PCT_FMT = '0%'
 
 # Columnas de datos: C-N (2026), O (total 2026), P-AA (2027), AB (total 2027)
 _MONTH_COLS_2026 = range(3, 15)   # C-N
@@ -22,6 +24,17 @@ _MONTH_COLS_2027 = range(16, 28)  # P-AA
 _TOTAL_COL_2027 = 28              # AB
 _ALL_DATA_COLS = range(3, 29)     # C-AB
 
+# sale date (D), departure date (E), Total Venta USD (M)
+_MATRIX_FIELDS = itemgetter("D", "E", "M")
+
+
+def _set_cell(cell, value, fmt):
+    """Write value and number format, leaving the style untouched if the
+    template cell already carries that format."""
+    cell.value = value
+    if cell.number_format != fmt:
+        cell.number_format = fmt
+
 
 def _week_to_row(week_num):
     """Convert week number to row in Booking Window sheet.
@@ -29,14 +42,25 @@ def _week_to_row(week_num):
     return 2 + (53 - week_num) * 2
 
 
-def _carry_forward_booking(ws_bw, prev_path):
+def _carry_forward_booking(ws_bw, prev_path, week_num=None):
     """Copia datos del Booking Window de la semana anterior al sheet actual.
 
     Solo copia semanas que no existen ya en el sheet actual (del template).
+    Si el sheet ya tiene datos en todas las semanas hasta week_num, no abre
+    el archivo anterior.
     """
     if not os.path.isfile(prev_path):
         return 0
 
+    # Early-exit: todas las semanas 1..week_num ya tienen datos (del template)
+    populated = {
+        r for (r, c), cell in ws_bw._cells.items()
+        if c in _MONTH_COLS_2026 and cell.value is not None
+    }
+    expected = {_week_to_row(w) for w in range(1, (week_num or 53) + 1)}
+    if expected <= populated:
+        return 0
+
     prev_wb = load_workbook(prev_path, data_only=True)
     if "Booking Window 2026" not in prev_wb.sheetnames:
         prev_wb.close()
@@ -69,15 +93,11 @@ def _carry_forward_booking(ws_bw, prev_path):
         for col in _ALL_DATA_COLS:
             val = prev_ws.cell(value_row, col).value
             if val is not None:
-                cell = ws_bw.cell(value_row, col)
-                cell.value = val
-                cell.number_format = USD_FMT
+                _set_cell(ws_bw.cell(value_row, col), val, USD_FMT)
 
             pct_val = prev_ws.cell(pct_row, col).value
             if pct_val is not None:
-                cell = ws_bw.cell(pct_row, col)
-                cell.value = pct_val
-                cell.number_format = '0%'
+                _set_cell(ws_bw.cell(pct_row, col), pct_val, PCT_FMT)
 
         carried += 1
 
@@ -98,11 +118,7 @@ def build_booking_matrix(data_rows):
     """
     matrix = {}
 
-    for r in data_rows:
-        fecha_inicio = r["E"]  # departure date
-        total_usd = r["M"]    # Total Venta USD
-        fecha = r["D"]         # sale date
-
+    for fecha, fecha_inicio, total_usd in map(_MATRIX_FIELDS, data_rows):
         if not fecha or not fecha_inicio:
             continue
 
@@ -143,7 +159,7 @@ def write_booking_to_excel(wb, matrix, week_num=None, prev_output=None):
 
     # Paso 1: Carry-forward desde la semana anterior
     if prev_output:
-        n_carried = _carry_forward_booking(ws_bw, prev_output)
+        n_carried = _carry_forward_booking(ws_bw, prev_output, week_num)
         if n_carried:
             print(f"  Booking Window: {n_carried} semanas copiadas de {os.path.basename(prev_output)}")
 
@@ -180,16 +196,12 @@ def write_booking_to_excel(wb, matrix, week_num=None, prev_output=None):
             val = month_totals.get(month, 0)
             if val:
                 col_idx = month + 2
-                cell = ws_bw.cell(value_row, col_idx)
-                cell.value = round(val, 2)
-                cell.number_format = USD_FMT
+                _set_cell(ws_bw.cell(value_row, col_idx), val, USD_FMT)
                 total_2026 += val
 
         # Write total 2026 (col O = 15)
         if total_2026:
-            cell = ws_bw.cell(value_row, 15)
-            cell.value = round(total_2026, 2)
-            cell.number_format = USD_FMT
+            _set_cell(ws_bw.cell(value_row, 15), total_2026, USD_FMT)
 
         # Write 2027 months (cols P-AA = 16-27)
         for month_key in range(14, 26):
@@ -197,26 +209,22 @@ def write_booking_to_excel(wb, matrix, week_num=None, prev_output=None):
             if val:
                 month_2027 = month_key - 13
                 col_idx = month_2027 + 15
-                cell = ws_bw.cell(value_row, col_idx)
-                cell.value = round(val, 2)
-                cell.number_format = USD_FMT
+                _set_cell(ws_bw.cell(value_row, col_idx), val, USD_FMT)
                 total_2027 += val
 
         # Write total 2027 (col AB = 28)
         if total_2027:
-            cell = ws_bw.cell(value_row, 28)
-            cell.value = round(total_2027, 2)
-            cell.number_format = USD_FMT
+            _set_cell(ws_bw.cell(value_row, 28), total_2027, USD_FMT)
 
         # Write percentage formulas in the row below
         pct_row = value_row + 1
         if total_2026:
             for col in range(3, 15):
-                cell = ws_bw.cell(pct_row, col)
-                cell.value = (
-                    f"={get_column_letter(col)}{value_row}/$O${value_row}"
+                _set_cell(
+                    ws_bw.cell(pct_row, col),
+                    f"={get_column_letter(col)}{value_row}/$O${value_row}",
+                    PCT_FMT,
                 )
-                cell.number_format = '0%'
 
         weeks_with_data.add(week)
 
@@ -256,24 +264,26 @@ def export_booking_xlsx(matrix, output_path):
     for cell in ws[1]:
         cell.font = cell.font.copy(bold=True)
 
-    # Data rows (sorted by week descending, like the template)
-    for week_num in sorted(matrix.keys(), reverse=True):
-        month_totals = matrix[week_num]
+    # Data rows (week descending, like the template). %W + 1 yields 1-54.
+    for week_num in range(54, 0, -1):
+        month_totals = matrix.get(week_num)
+        if month_totals is None:
+            continue
         row = [f"WEEK {week_num}"]
 
         total_2026 = 0
         for month in range(1, 13):
-            val = round(month_totals.get(month, 0), 2)
+            val = month_totals.get(month, 0)
             row.append(val)
             total_2026 += val
-        row.append(round(total_2026, 2))
+        row.append(total_2026)
 
         total_2027 = 0
         for month_key in range(14, 26):
-            val = round(month_totals.get(month_key, 0), 2)
+            val = month_totals.get(month_key, 0)
             row.append(val)
             total_2027 += val
-        row.append(round(total_2027, 2))
+        row.append(total_2027)
 
         ws.append(row)
 
@@ -5,6 +5,9 @@ Exporta los datos de reservas (hoja DATA) como Excel independiente por entidad.
 from datetime import datetime
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.styles.colors import Color
 
 
 # Headers matching the DATA sheet in the Weekly Report
@@ -25,6 +28,20 @@ COL_ORDER = [
     "V", "W", "X", None, "Z",
 ]
 
+DATE_FMT = "MM-DD-YY"
+
+# Formato por columna: D, E, F, V (fechas), J, L-P (números), Q (porcentaje)
+COL_FORMATS = {
+    "D": DATE_FMT, "E": DATE_FMT, "F": DATE_FMT, "V": DATE_FMT,
+    "J": "0", "L": "0", "M": "0", "N": "0", "O": "0", "P": "0",
+    "Q": "0.00%",
+}
+_COL_SPEC = [(key, COL_FORMATS.get(key)) for key in COL_ORDER]
+
+# Fuente por defecto de openpyxl en negrita (header)
+HEADER_FONT = Font(name="Calibri", sz=11, family=2, bold=True,
+                   color=Color(theme=1), scheme="minor")
+
 
 def export_bookings_xlsx(data_rows, output_path, company):
     """Export DATA rows for a single entity to a standalone Excel file.
@@ -34,42 +51,34 @@ def export_bookings_xlsx(data_rows, output_path, company):
         output_path: Path for the output .xlsx file.
         company: "SL" or "LLC" (for the filename/title).
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Bookings {company}"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(f"Bookings {company}")
 
     # Header row
-    ws.append(HEADERS)
-    for cell in ws[1]:
-        cell.font = cell.font.copy(bold=True)
+    header = []
+    for h in HEADERS:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.font = HEADER_FONT
+        header.append(cell)
+    ws.append(header)
 
-    # Data rows
+    # Data rows (las celdas con formato se crean ya formateadas)
     for row_data in data_rows:
         row = []
-        for col_key in COL_ORDER:
+        for col_key, fmt in _COL_SPEC:
             if col_key is None:
                 row.append("")
-            else:
-                row.append(row_data.get(col_key))
+                continue
+            val = row_data.get(col_key)
+            if fmt is None or val is None or (
+                    fmt == DATE_FMT and not isinstance(val, datetime)):
+                row.append(val)
+                continue
+            cell = WriteOnlyCell(ws, value=val)
+            cell.number_format = fmt
+            row.append(cell)
         ws.append(row)
 
-    # Format columns
-    for row in range(2, len(data_rows) + 2):
-        # Dates: D(4), E(5), F(6), V(22)
-        for col in [4, 5, 6, 22]:
-            cell = ws.cell(row, col)
-            if cell.value and isinstance(cell.value, datetime):
-                cell.number_format = "MM-DD-YY"
-        # Numbers: J(10), L(12), M(13), N(14), O(15), P(16)
-        for col in [10, 12, 13, 14, 15, 16]:
-            cell = ws.cell(row, col)
-            if cell.value is not None:
-                cell.number_format = '0'
-        # Percentage: Q(17)
-        cell = ws.cell(row, 17)
-        if cell.value is not None:
-            cell.number_format = '0.00%'
-
     wb.save(output_path)
     wb.close()
     print(f"  Bookings {company} exportado: {output_path}")
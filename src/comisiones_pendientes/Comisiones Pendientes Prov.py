@@ -18,11 +18,15 @@ Filtros aplicados a dreserva.csv:
 import os
 import glob
 import shutil
-from datetime import datetime, timedelta
+from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
 
 import pandas as pd
 from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 from openpyxl.workbook.properties import CalcProperties
 
@@ -37,6 +41,29 @@ _FX_CURRENCIES = ["EUR", "USD", "CHF", "GBP", "GPB", "JPY", "MXN"]
 
 _ENTITY_LABELS = {"SL": "Madrid", "LLC": "Mexico"}
 
+# Columnas leidas de cada CSV y tipos explicitos. Los ids (folio, proveedor,
+# clave) no se tipan para que un vacio no rompa la lectura como int64.
+# Las columnas que falten se omiten al leer; las opcionales (_*_DEFAULTS) se
+# rellenan despues con su valor por defecto.
+_DRESERVA_COLS = frozenset({
+    "folio", "proveedor", "inicio_estancia", "fin_estancia", "moneda",
+    "monto_comision", "comision_pendiente", "fecha_pago", "servicio_cancelado",
+})
+_DRESERVA_DTYPES = {
+    "inicio_estancia": "str", "fin_estancia": "str", "moneda": "str",
+    "monto_comision": "float64", "comision_pendiente": "float64",
+    "fecha_pago": "str", "servicio_cancelado": "float64",
+}
+_DRESERVA_DEFAULTS = {
+    "proveedor": None, "inicio_estancia": None, "fin_estancia": None, "moneda": "",
+}
+_PROVEEDOR_COLS = frozenset({"clave", "nombre", "correo_e_contacto", "ciudad"})
+_PROVEEDOR_DTYPES = {"nombre": "str", "correo_e_contacto": "str", "ciudad": "str"}
+_PROVEEDOR_DEFAULTS = {"nombre": "", "correo_e_contacto": "", "ciudad": ""}
+_RESERVA_COLS = frozenset({"folio", "vendedor"})
+_RESERVA_DTYPES = {"vendedor": "str"}
+_RESERVA_DEFAULTS = {"vendedor": ""}
+
 
 # ── Carga de CSVs ────────────────────────────────────────────────────────
 
@@ -51,78 +78,118 @@ def _find_csv(data_dir, base_name):
     return candidates[0] if candidates else None
 
 
-def _load_csv(data_dir, filename):
-    """Lee un CSV desde data_dir con encoding latin-1."""
+def _load_csv(data_dir, filename, usecols=None, dtype=None, skipinitialspace=False,
+              defaults=None):
+    """Lee un CSV desde data_dir con encoding latin-1 (solo usecols si se indica).
+
+    Las columnas de usecols que no existan en el CSV se omiten; las de
+    `defaults` que falten se anaden con su valor por defecto.
+
+    Se usa el engine C: los exports de dreserva traen campos entre comillas
+    con saltos de linea, que el engine pyarrow no soporta (ParserError).
+    """
     path = _find_csv(data_dir, filename)
     if not path:
         return pd.DataFrame()
-    return pd.read_csv(path, encoding="latin-1")
+    df = pd.read_csv(
+        path, encoding="latin-1", engine="c", usecols=usecols, dtype=dtype,
+        skipinitialspace=skipinitialspace,
+    )
+    for col, default in (defaults or {}).items():
+        if col not in df:
+            df[col] = default
+    return df
 
 
 # ── Filtrado de dreserva ─────────────────────────────────────────────────
 
 def _load_filtered_dreserva(data_dir):
     """Carga dreserva.csv con los filtros de comisiones pendientes."""
-    df = _load_csv(data_dir, "dreserva")
+    df = _load_csv(
+        data_dir, "dreserva", _DRESERVA_COLS.__contains__, _DRESERVA_DTYPES,
+        skipinitialspace=True, defaults=_DRESERVA_DEFAULTS,
+    )
     if df.empty:
         return df
 
     mask = (
-        (df["comision_pendiente"] == 1)
-        & (df["monto_comision"] != 0)
-        & (df["fecha_pago"].astype(str).str.strip() == "0000-00-00")
-        & (df["servicio_cancelado"] == 0)
+        (df["comision_pendiente"].to_numpy() == 1)
+        & (df["monto_comision"].to_numpy() != 0)
+        & (df["fecha_pago"].str.strip().to_numpy() == "0000-00-00")
+        & (df["servicio_cancelado"].to_numpy() == 0)
+    )
+    # Fechas parseadas una sola vez (Timestamp o NaT); assign ya devuelve
+    # un frame nuevo, sin .copy() intermedio.
+    df = df.loc[mask]
+    return df.assign(
+        inicio_estancia_dt=_to_datetime(df["inicio_estancia"]),
+        fin_estancia_dt=_to_datetime(df["fin_estancia"]),
     )
-    return df[mask].copy()
 
 
 # ── Lookups ──────────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=4)
 def _load_proveedor_df(data_dir):
-    """Carga proveedor.csv completo como DataFrame."""
-    return _load_csv(data_dir, "proveedor")
+    """Carga proveedor.csv como DataFrame (cacheado por data_dir; no mutar)."""
+    return _load_csv(
+        data_dir, "proveedor", _PROVEEDOR_COLS.__contains__, _PROVEEDOR_DTYPES,
+        defaults=_PROVEEDOR_DEFAULTS,
+    )
+
+
+def _str_col(df, col):
+    """Columna como array de str sin espacios; NaN -> ""."""
+    return df[col].fillna("").astype(str).str.strip().to_numpy()
 
 
 def _build_proveedor_lookup(prov_df):
     """Crea {clave: {nombre, email, ciudad}} desde proveedor.csv."""
-    lookup = {}
     if prov_df.empty:
-        return lookup
-    for _, r in prov_df.iterrows():
-        clave = r.get("clave")
-        if pd.notna(clave):
-            lookup[int(clave)] = {
-                "nombre": str(r.get("nombre", "")).strip() if pd.notna(r.get("nombre")) else "",
-                "email": str(r.get("correo_e_contacto", "")).strip() if pd.notna(r.get("correo_e_contacto")) else "",
-                "ciudad": str(r.get("ciudad", "")).strip() if pd.notna(r.get("ciudad")) else "",
-            }
-    return lookup
-
-
+        return {}
+    return {
+        int(clave): {"nombre": nombre, "email": email, "ciudad": ciudad}
+        for clave, nombre, email, ciudad in zip(
+            prov_df["clave"].to_numpy(),
+            _str_col(prov_df, "nombre"),
+            _str_col(prov_df, "correo_e_contacto"),
+            _str_col(prov_df, "ciudad"),
+        )
+        if pd.notna(clave)
+    }
+
+
+@lru_cache(maxsize=4)
 def _build_vendedor_lookup(data_dir):
-    """Crea {folio: vendedor} desde reserva.csv."""
-    df = _load_csv(data_dir, "reserva")
+    """Crea {folio: vendedor} desde reserva.csv (cacheado por data_dir; no mutar)."""
+    df = _load_csv(
+        data_dir, "reserva", _RESERVA_COLS.__contains__, _RESERVA_DTYPES,
+        defaults=_RESERVA_DEFAULTS,
+    )
     if df.empty:
         return {}
-    lookup = {}
-    for _, r in df.iterrows():
-        folio = r.get("folio")
-        vendedor = r.get("vendedor", "")
-        if pd.notna(folio):
-            lookup[int(folio)] = str(vendedor).strip()
-    return lookup
+    return {
+        int(folio): vendedor
+        for folio, vendedor in zip(
+            df["folio"].to_numpy(),
+            df["vendedor"].astype(str).str.strip().to_numpy(),
+        )
+        if pd.notna(folio)
+    }
 
 
 # ── Tabla FX ─────────────────────────────────────────────────────────────
 
 def _build_fx_rows(fx):
-    """Construye filas FX: [(DIVISA, Fx_EUR, Fx_USD), ...]."""
-    rows = []
-    for cur in _FX_CURRENCIES:
-        fx_eur = fx.get(cur, {}).get("EUR", FALLBACK_FX.get(cur, {}).get("EUR", 1))
-        fx_usd = fx.get(cur, {}).get("USD", FALLBACK_FX.get(cur, {}).get("USD", 1))
-        rows.append((cur, fx_eur, fx_usd))
-    return rows
+    """Construye filas FX: [(DIVISA, Fx_EUR, Fx_USD), ...].
+
+    Se calcula una vez por reporte y se pasa a las hojas Data.
+    """
+    merged = {cur: {**FALLBACK_FX.get(cur, {}), **fx.get(cur, {})} for cur in _FX_CURRENCIES}
+    return [
+        (cur, merged[cur].get("EUR", 1), merged[cur].get("USD", 1))
+        for cur in _FX_CURRENCIES
+    ]
 
 
 def _get_fx_eur(moneda, fx):
@@ -143,17 +210,22 @@ def _get_fx_usd(moneda, fx):
 
 # ── Helpers de fecha ─────────────────────────────────────────────────────
 
-def _parse_date(val):
-    """Parsea un valor de fecha, retorna datetime o None."""
-    if pd.isna(val):
-        return None
-    s = str(val).strip()
-    if s in ("", "0000-00-00"):
-        return None
-    try:
-        return pd.to_datetime(s)
-    except Exception:
-        return None
+def _to_datetime(series):
+    """Convierte una columna de fechas a Timestamp; vacios y '0000-00-00' -> NaT.
+
+    format="mixed" parsea cada valor por separado (como el antiguo
+    _parse_date); sin el, pandas infiere el formato del primer valor y
+    convierte el resto a NaT:
+
+    >>> _to_datetime(pd.Series(["2026-01-05", "2026-02-03 10:00:00",
+    ...                         "05/02/2026", "0000-00-00", None])).tolist()
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [Timestamp('2026-01-05 00:00:00'), Timestamp('2026-02-03 10:00:00'),
+     Timestamp('2026-05-02 00:00:00'), NaT, NaT]
+    """
+    return pd.to_datetime(
+        series.astype(str).str.strip(), errors="coerce", format="mixed",
+    )
 
 
 # ── Escritura de hojas de datos ──────────────────────────────────────────
@@ -187,123 +259,155 @@ def _parse_date(val):
 #   S-T: codigo proveedor, nombre (proveedor lookup)
 #   X-Z: DIVISA, Fx EUR, Fx USD
 
+# Formulas por fila (columna, plantilla %-format con la fila en %(r)d)
+_LLC_FORMULAS = (
+    (7, "=F%(r)d*_xlfn.XLOOKUP(E%(r)d,Z:Z,AA:AA)"),      # G: EUR
+    (8, "=D%(r)d+45"),                                  # H: 45 dias
+    (9, '=TEXT(H%(r)d,"mmmm")'),                        # I: mes
+    (10, "=MONTH(H%(r)d)"),                             # J: num mes
+    (11, "=YEAR(H%(r)d)"),                              # K: ano
+    (12, "=_xlfn.XLOOKUP(B%(r)d,Q:Q,R:R)"),             # L: Nombre Prov
+    (13, "=_xlfn.XLOOKUP(A%(r)d,V:V,W:W)"),             # M: Vendedor
+    (14, "=F%(r)d*_xlfn.XLOOKUP(E%(r)d,Z:Z,AB:AB)"),    # N: USD
+)
+_SL_FORMULAS = (
+    (7, "=F%(r)d*_xlfn.XLOOKUP(E%(r)d,X:X,Y:Y)"),       # G: EUR
+    (8, "=_xlfn.XLOOKUP(B%(r)d,S:S,T:T)"),              # H: Nombre Prov
+    (9, "=D%(r)d+45"),                                  # I: 45 dias
+    (10, '=TEXT(I%(r)d,"mmmm")'),                       # J: mes
+    (11, "=MONTH(I%(r)d)"),                             # K: num mes
+    (12, "=YEAR(I%(r)d)"),                              # L: ano
+    (13, '=_xlfn.XLOOKUP(A%(r)d,P:P,Q:Q,"no")'),        # M: Vendedor
+    (14, "=F%(r)d*_xlfn.XLOOKUP(E%(r)d,X:X,Z:Z)"),      # N: USD
+)
+
+
 def _clear_data_rows(ws):
-    """Limpia todos los datos debajo de la fila 1 (preserva headers)."""
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-        for cell in row:
+    """Limpia todos los datos debajo de la fila 1 (preserva headers y formato).
+
+    Recorre solo las celdas existentes (ws._cells): iter_rows crearia una
+    celda por cada posicion vacia del rango. No se usa delete_rows ni
+    del wb[...] porque el template trae number_format por celda y las
+    pivots apuntan a la hoja por nombre.
+    """
+    for (row, _), cell in ws._cells.items():
+        if row > 1:
             cell.value = None
 
 
-def _write_data_llc(ws, dreserva_df, prov_df, vendedor_lookup, fx):
-    """Escribe datos en la hoja Data LLC."""
+def _prov_pairs(prov_df):
+    """[(clave, nombre), ...] para la tabla auxiliar de proveedores."""
+    if prov_df.empty:
+        return []
+    return list(zip(prov_df["clave"].to_numpy(), prov_df["nombre"].to_numpy()))
+
+
+def _write_block(ws, first_col, rows, first_row=2):
+    """Escribe una tabla auxiliar contigua (lista de tuplas) desde first_col."""
+    if not rows:
+        return
+    block = ws.iter_rows(
+        min_row=first_row, max_row=first_row + len(rows) - 1,
+        min_col=first_col, max_col=first_col + len(rows[0]) - 1,
+    )
+    for cells, values in zip(block, rows):
+        for cell, value in zip(cells, values):
+            cell.value = value
+
+
+def _data_columns(dreserva_df):
+    """Extrae las columnas A-F de dreserva como arrays alineados.
+
+    Returns:
+        zip de (folio, proveedor, inicio, fin, moneda, monto_comision); las
+        fechas son Timestamp o NaT.
+    """
+    return zip(
+        dreserva_df["folio"].to_numpy(),
+        dreserva_df["proveedor"].to_numpy(),
+        dreserva_df["inicio_estancia_dt"],
+        dreserva_df["fin_estancia_dt"],
+        dreserva_df["moneda"].astype(str).str.strip().to_numpy(),
+        dreserva_df["monto_comision"].to_numpy(),
+    )
+
+
+def _write_data_llc(ws, dreserva_df, prov_df, vendedor_sorted, fx_rows):
+    """Escribe datos en la hoja Data LLC.
+
+    vendedor_sorted: [(folio, vendedor), ...] ya ordenado por folio.
+    fx_rows: filas de _build_fx_rows().
+    """
     _clear_data_rows(ws)
     if dreserva_df.empty:
         return
 
     # Columnas A-F (datos directos) + G-M (formulas)
-    for i, (_, row) in enumerate(dreserva_df.iterrows(), start=2):
-        ws.cell(i, 1, row.get("folio"))        # A: folio
-        ws.cell(i, 2, row.get("proveedor"))    # B: proveedor
+    rows = _data_columns(dreserva_df)
+    for i, (folio, prov, dt_inicio, dt_fin, moneda, monto) in enumerate(rows, start=2):
+        ws.cell(i, 1, folio)        # A: folio
+        ws.cell(i, 2, prov)         # B: proveedor
 
-        dt_inicio = _parse_date(row.get("inicio_estancia"))
-        if dt_inicio:
-            ws.cell(i, 3, dt_inicio)
-            ws.cell(i, 3).number_format = "DD/MM/YYYY"
+        if pd.notna(dt_inicio):
+            ws.cell(i, 3, dt_inicio).number_format = "DD/MM/YYYY"
+        if pd.notna(dt_fin):
+            ws.cell(i, 4, dt_fin).number_format = "DD/MM/YYYY"
 
-        dt_fin = _parse_date(row.get("fin_estancia"))
-        if dt_fin:
-            ws.cell(i, 4, dt_fin)
-            ws.cell(i, 4).number_format = "DD/MM/YYYY"
-
-        ws.cell(i, 5, str(row.get("moneda", "")).strip())   # E: moneda
-        ws.cell(i, 6, row.get("monto_comision"))             # F: monto_comision
+        ws.cell(i, 5, moneda)       # E: moneda
+        ws.cell(i, 6, monto)        # F: monto_comision
 
         # Formulas
-        ws.cell(i, 7).value = f"=F{i}*_xlfn.XLOOKUP(E{i},Z:Z,AA:AA)"       # G
-        ws.cell(i, 8).value = f"=D{i}+45"                                    # H
+        row_ref = {"r": i}
+        for col, tpl in _LLC_FORMULAS:
+            ws.cell(i, col).value = tpl % row_ref
         ws.cell(i, 8).number_format = "DD/MM/YYYY"
-        ws.cell(i, 9).value = f'=TEXT(H{i},"mmmm")'                          # I
-        ws.cell(i, 10).value = f"=MONTH(H{i})"                               # J
-        ws.cell(i, 11).value = f"=YEAR(H{i})"                                # K
-        ws.cell(i, 12).value = f"=_xlfn.XLOOKUP(B{i},Q:Q,R:R)"              # L
-        ws.cell(i, 13).value = f"=_xlfn.XLOOKUP(A{i},V:V,W:W)"              # M
-        ws.cell(i, 14).value = f"=F{i}*_xlfn.XLOOKUP(E{i},Z:Z,AB:AB)"      # N: USD
 
     # Header columna N
     ws.cell(1, 14).value = "Comision en USD"
 
-    # Proveedor lookup Q-R
-    if not prov_df.empty:
-        for j, (_, r) in enumerate(prov_df.iterrows(), start=2):
-            ws.cell(j, 17, r.get("clave"))     # Q: clave
-            ws.cell(j, 18, r.get("nombre"))    # R: nombre
-
-    # Vendedor lookup V-W
-    for j, (folio, vend) in enumerate(sorted(vendedor_lookup.items()), start=2):
-        ws.cell(j, 22, folio)      # V: folio
-        ws.cell(j, 23, vend)       # W: vendedor
+    # Tablas auxiliares: proveedor Q-R, vendedor V-W, FX Z-AB
+    _write_block(ws, 17, _prov_pairs(prov_df))
+    _write_block(ws, 22, vendedor_sorted)
+    _write_block(ws, 26, fx_rows)
 
-    # FX table Z-AB
-    for j, (divisa, fx_eur, fx_usd) in enumerate(_build_fx_rows(fx), start=2):
-        ws.cell(j, 26, divisa)     # Z: DIVISA
-        ws.cell(j, 27, fx_eur)     # AA: Fx EUR
-        ws.cell(j, 28, fx_usd)     # AB: Fx USD
 
+def _write_data_sl(ws, dreserva_df, prov_df, vendedor_sorted, fx_rows):
+    """Escribe datos en la hoja Data SL.
 
-def _write_data_sl(ws, dreserva_df, prov_df, vendedor_lookup, fx):
-    """Escribe datos en la hoja Data SL."""
+    vendedor_sorted: [(folio, vendedor), ...] ya ordenado por folio.
+    fx_rows: filas de _build_fx_rows().
+    """
     _clear_data_rows(ws)
     if dreserva_df.empty:
         return
 
     # Columnas A-F (datos directos) + G-M (formulas - layout SL)
-    for i, (_, row) in enumerate(dreserva_df.iterrows(), start=2):
-        ws.cell(i, 1, row.get("folio"))        # A: folio
-        ws.cell(i, 2, row.get("proveedor"))    # B: proveedor
-
-        dt_inicio = _parse_date(row.get("inicio_estancia"))
-        if dt_inicio:
-            ws.cell(i, 3, dt_inicio)
-            ws.cell(i, 3).number_format = "DD/MM/YYYY"
+    rows = _data_columns(dreserva_df)
+    for i, (folio, prov, dt_inicio, dt_fin, moneda, monto) in enumerate(rows, start=2):
+        ws.cell(i, 1, folio)        # A: folio
+        ws.cell(i, 2, prov)         # B: proveedor
 
-        dt_fin = _parse_date(row.get("fin_estancia"))
-        if dt_fin:
-            ws.cell(i, 4, dt_fin)
-            ws.cell(i, 4).number_format = "DD/MM/YYYY"
+        if pd.notna(dt_inicio):
+            ws.cell(i, 3, dt_inicio).number_format = "DD/MM/YYYY"
+        if pd.notna(dt_fin):
+            ws.cell(i, 4, dt_fin).number_format = "DD/MM/YYYY"
 
-        ws.cell(i, 5, str(row.get("moneda", "")).strip())   # E: moneda
-        ws.cell(i, 6, row.get("monto_comision"))             # F: monto_comision
+        ws.cell(i, 5, moneda)       # E: moneda
+        ws.cell(i, 6, monto)        # F: monto_comision
 
         # Formulas (SL tiene layout diferente: nombre prov antes de fecha)
-        ws.cell(i, 7).value = f"=F{i}*_xlfn.XLOOKUP(E{i},X:X,Y:Y)"         # G: EUR
-        ws.cell(i, 8).value = f"=_xlfn.XLOOKUP(B{i},S:S,T:T)"              # H: Nombre Prov
-        ws.cell(i, 9).value = f"=D{i}+45"                                    # I: 45 dias
+        row_ref = {"r": i}
+        for col, tpl in _SL_FORMULAS:
+            ws.cell(i, col).value = tpl % row_ref
         ws.cell(i, 9).number_format = "DD/MM/YYYY"
-        ws.cell(i, 10).value = f'=TEXT(I{i},"mmmm")'                         # J: mes
-        ws.cell(i, 11).value = f"=MONTH(I{i})"                               # K: num mes
-        ws.cell(i, 12).value = f"=YEAR(I{i})"                                # L: ano
-        ws.cell(i, 13).value = f'=_xlfn.XLOOKUP(A{i},P:P,Q:Q,"no")'         # M: Vendedor
-        ws.cell(i, 14).value = f"=F{i}*_xlfn.XLOOKUP(E{i},X:X,Z:Z)"        # N: USD
 
     # Header columna N
     ws.cell(1, 14).value = "Comision en USD"
 
-    # Vendedor lookup P-Q
-    for j, (folio, vend) in enumerate(sorted(vendedor_lookup.items()), start=2):
-        ws.cell(j, 16, folio)      # P: folio
-        ws.cell(j, 17, vend)       # Q: vendedor
-
-    # Proveedor lookup S-T
-    if not prov_df.empty:
-        for j, (_, r) in enumerate(prov_df.iterrows(), start=2):
-            ws.cell(j, 19, r.get("clave"))     # S: codigo proveedor
-            ws.cell(j, 20, r.get("nombre"))    # T: nombre
-
-    # FX table X-Z
-    for j, (divisa, fx_eur, fx_usd) in enumerate(_build_fx_rows(fx), start=2):
-        ws.cell(j, 24, divisa)     # X: DIVISA
-        ws.cell(j, 25, fx_eur)     # Y: Fx EUR
-        ws.cell(j, 26, fx_usd)     # Z: Fx USD
+    # Tablas auxiliares: vendedor P-Q, proveedor S-T, FX X-Z
+    _write_block(ws, 16, vendedor_sorted)
+    _write_block(ws, 19, _prov_pairs(prov_df))
+    _write_block(ws, 24, fx_rows)
 
 
 # ── Hojas Desglose (una por entidad) ─────────────────────────────────────
@@ -315,48 +419,105 @@ _DESGLOSE_HEADERS = [
 ]
 
 
+def _nullable(series):
+    """Series a dtype object con None en lugar de NaN/NaT."""
+    return series.astype(object).where(series.notna(), None)
+
+
+def _round2(series):
+    """round(x, 2) de Python por elemento (Series.round difiere en medios centavos)."""
+    return pd.Series([round(v, 2) for v in series.tolist()], index=series.index)
+
+
 def _build_desglose_rows(dreserva_df, prov_lookup, vendedor_lookup, fx):
     """Construye filas del desglose para una entidad, ordenadas por proveedor."""
-    rows = []
-    for _, row in dreserva_df.iterrows():
-        folio = row.get("folio")
-        prov_code = row.get("proveedor")
-        moneda = str(row.get("moneda", "")).strip()
-        monto = row.get("monto_comision", 0)
-
-        prov_info = prov_lookup.get(int(prov_code), {}) if pd.notna(prov_code) else {}
-        vendedor = vendedor_lookup.get(int(folio), "") if pd.notna(folio) else ""
-
-        dt_fin = _parse_date(row.get("fin_estancia"))
-        fecha_limite = (dt_fin + timedelta(days=45)) if dt_fin else None
-        mes = fecha_limite.month if fecha_limite else None
-        ano = fecha_limite.year if fecha_limite else None
-
-        fx_eur = _get_fx_eur(moneda, fx)
-        fx_usd = _get_fx_usd(moneda, fx)
-        comision_eur = round(monto * fx_eur, 2) if monto else 0
-        comision_usd = round(monto * fx_usd, 2) if monto else 0
-
-        rows.append({
-            "proveedor": prov_code,
-            "nombre_prov": prov_info.get("nombre", ""),
-            "email": prov_info.get("email", ""),
-            "ciudad": prov_info.get("ciudad", ""),
-            "folio": folio,
-            "fin": dt_fin,
-            "moneda": moneda,
-            "monto": monto,
-            "comision_eur": comision_eur,
-            "comision_usd": comision_usd,
-            "fecha_limite": fecha_limite,
-            "mes": mes,
-            "ano": ano,
-            "vendedor": vendedor,
-        })
+    if dreserva_df.empty:
+        return []
+
+    folio = dreserva_df["folio"]
+    prov_code = dreserva_df["proveedor"]
+    moneda = dreserva_df["moneda"].astype(str).str.strip()
+    monto = dreserva_df["monto_comision"]
+
+    prov_info = [
+        prov_lookup.get(int(p), {}) if pd.notna(p) else {}
+        for p in prov_code.to_numpy()
+    ]
+    vendedor = [
+        vendedor_lookup.get(int(f), "") if pd.notna(f) else ""
+        for f in folio.to_numpy()
+    ]
+
+    dt_fin = dreserva_df["fin_estancia_dt"]
+    fecha_limite = dt_fin + pd.Timedelta(days=45)
+
+    # Tasas por moneda: una consulta por divisa distinta, no por fila
+    monedas = moneda.unique()
+    fx_eur = moneda.map({cur: _get_fx_eur(cur, fx) for cur in monedas})
+    fx_usd = moneda.map({cur: _get_fx_usd(cur, fx) for cur in monedas})
+
+    df = pd.DataFrame({
+        "proveedor": prov_code,
+        "nombre_prov": [info.get("nombre", "") for info in prov_info],
+        "email": [info.get("email", "") for info in prov_info],
+        "ciudad": [info.get("ciudad", "") for info in prov_info],
+        "folio": folio,
+        "fin": _nullable(dt_fin),
+        "moneda": moneda,
+        "monto": monto,
+        "comision_eur": _round2(monto * fx_eur).where(monto != 0, 0),
+        "comision_usd": _round2(monto * fx_usd).where(monto != 0, 0),
+        "fecha_limite": _nullable(fecha_limite),
+        "mes": _nullable(fecha_limite.dt.month.astype("Int64")),
+        "ano": _nullable(fecha_limite.dt.year.astype("Int64")),
+        "vendedor": vendedor,
+    }, index=dreserva_df.index)
 
     # Ordenar por nombre proveedor, luego folio
-    rows.sort(key=lambda r: (r.get("nombre_prov", ""), r.get("folio") or 0))
-    return rows
+    df = (
+        df.assign(_folio_key=folio.fillna(0))
+        .sort_values(["nombre_prov", "_folio_key"], kind="stable")
+        .drop(columns="_folio_key")
+    )
+    return df.to_dict(orient="records")
+
+
+_THIN_BORDER = Border(
+    left=Side(style="thin"), right=Side(style="thin"),
+    top=Side(style="thin"), bottom=Side(style="thin"),
+)
+
+# Estilo por columna del cuerpo del Desglose (1-based, 14 columnas)
+_DESGLOSE_COL_STYLES = (
+    ["desglose_body"] * 5 + ["desglose_date", "desglose_body"]
+    + ["desglose_num"] * 3 + ["desglose_date"] + ["desglose_body"] * 3
+)
+
+
+def _register_desglose_styles(wb):
+    """Registra los NamedStyle del Desglose una sola vez por workbook.
+
+    Los estilos del cuerpo llevan la fuente por defecto del template (la que
+    tenian las celdas antes de usar NamedStyle); sin ella caerian en Font().
+    """
+    body_font = copy(wb._fonts[0])
+    styles = [
+        NamedStyle(
+            name="desglose_header",
+            font=Font(bold=True, color="FFFFFF", size=11),
+            fill=PatternFill("solid", fgColor="4472C4"),
+            alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+            border=_THIN_BORDER,
+        ),
+        NamedStyle(name="desglose_body", font=body_font, border=_THIN_BORDER),
+        NamedStyle(name="desglose_date", font=body_font, border=_THIN_BORDER,
+                   number_format="DD/MM/YYYY"),
+        NamedStyle(name="desglose_num", font=body_font, border=_THIN_BORDER,
+                   number_format="#,##0.00"),
+    ]
+    for style in styles:
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
 
 
 def _write_desglose_sheet(wb, sheet_name, entity_label, desglose_rows):
@@ -368,13 +529,6 @@ def _write_desglose_sheet(wb, sheet_name, entity_label, desglose_rows):
 
     title_font = Font(bold=True, size=13, color="FFFFFF")
     title_fill = PatternFill("solid", fgColor="2F5496")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill("solid", fgColor="4472C4")
-    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(
-        left=Side(style="thin"), right=Side(style="thin"),
-        top=Side(style="thin"), bottom=Side(style="thin"),
-    )
     n_cols = len(_DESGLOSE_HEADERS)
 
     # Titulo
@@ -386,48 +540,33 @@ def _write_desglose_sheet(wb, sheet_name, entity_label, desglose_rows):
 
     # Headers
     for col_idx, header in enumerate(_DESGLOSE_HEADERS, start=1):
-        cell = ws.cell(2, col_idx, header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_align
-        cell.border = thin_border
+        ws.cell(2, col_idx, header).style = "desglose_header"
 
     if not desglose_rows:
         ws.cell(3, 1).value = "Sin registros"
         return
 
-    date_fmt = "DD/MM/YYYY"
-    for i, row in enumerate(desglose_rows, start=3):
-        ws.cell(i, 1, row["proveedor"])
-        ws.cell(i, 2, row["nombre_prov"])
-        ws.cell(i, 3, row["email"])
-        ws.cell(i, 4, row["ciudad"])
-        ws.cell(i, 5, row["folio"])
-
-        if row["fin"]:
-            ws.cell(i, 6, row["fin"])
-            ws.cell(i, 6).number_format = date_fmt
-
-        ws.cell(i, 7, row["moneda"])
-        ws.cell(i, 8, row["monto"])
-        ws.cell(i, 8).number_format = "#,##0.00"
-        ws.cell(i, 9, row["comision_eur"])
-        ws.cell(i, 9).number_format = "#,##0.00"
-        ws.cell(i, 10, row["comision_usd"])
-        ws.cell(i, 10).number_format = "#,##0.00"
-
-        if row["fecha_limite"]:
-            ws.cell(i, 11, row["fecha_limite"])
-            ws.cell(i, 11).number_format = date_fmt
-        if row["mes"]:
-            ws.cell(i, 12, MONTH_NAMES_ES.get(row["mes"], str(row["mes"])))
-        if row["ano"]:
-            ws.cell(i, 13, row["ano"])
-
-        ws.cell(i, 14, row["vendedor"])
-
-        for col in range(1, n_cols + 1):
-            ws.cell(i, col).border = thin_border
+    # Estilo resuelto una vez por columna; cada fila se anade con ws.append
+    # de celdas ya estilizadas (sin ws.cell(i, col) por valor).
+    col_styles = []
+    for name in _DESGLOSE_COL_STYLES:
+        proto = Cell(ws)
+        proto.style = name
+        col_styles.append(proto._style)
+
+    for row in desglose_rows:
+        mes = row["mes"]
+        values = (
+            row["proveedor"], row["nombre_prov"], row["email"], row["ciudad"],
+            row["folio"], row["fin"] or None, row["moneda"], row["monto"],
+            row["comision_eur"], row["comision_usd"], row["fecha_limite"] or None,
+            MONTH_NAMES_ES.get(mes, str(mes)) if mes else None,
+            row["ano"] or None, row["vendedor"],
+        )
+        ws.append([
+            Cell(ws, value=val, style_array=copy(style))
+            for val, style in zip(values, col_styles)
+        ])
 
     # Anchos de columna
     widths = [10, 25, 30, 15, 10, 14, 8, 14, 14, 14, 14, 12, 8, 15]
@@ -435,6 +574,32 @@ def _write_desglose_sheet(wb, sheet_name, entity_label, desglose_rows):
         ws.column_dimensions[get_column_letter(col_idx)].width = w
 
 
+# ── Carga por entidad ────────────────────────────────────────────────────
+
+def _prepare_entity(cfg, fx):
+    """Carga CSVs y construye lookups + desglose de una entidad (sin openpyxl).
+
+    Returns:
+        Dict con dreserva_df, prov_df, vendedor_sorted y desglose_rows, o None
+        si el directorio de datos no existe.
+    """
+    data_dir = cfg["data_dir"]
+    if not os.path.exists(data_dir):
+        return None
+
+    dreserva_df = _load_filtered_dreserva(data_dir)
+    prov_df = _load_proveedor_df(data_dir)
+    prov_lookup = _build_proveedor_lookup(prov_df)
+    vendedor_lookup = _build_vendedor_lookup(data_dir)
+
+    return {
+        "dreserva_df": dreserva_df,
+        "prov_df": prov_df,
+        "vendedor_sorted": sorted(vendedor_lookup.items()),
+        "desglose_rows": _build_desglose_rows(dreserva_df, prov_lookup, vendedor_lookup, fx),
+    }
+
+
 # ── Limpieza y pivot refresh ─────────────────────────────────────────────
 
 def _cleanup_sheets(wb):
@@ -507,12 +672,13 @@ def _force_pivot_refresh(wb):
             cache.refreshOnLoad = True
             cache.recordCount = 0
 
-            try:
-                if cache.records is not None:
-                    cache.records.r = []
-            except (AttributeError, TypeError):
-                pass
-
+            # Excel descarta los records al refrescar: no se escribe la parte
+            # pivotCacheRecords ni su relacion (id) en la definicion, y se
+            # declara saveData="0" para que la definicion sea coherente (sin
+            # el atributo Excel asume que los datos estan guardados).
+            cache.records = None
+            cache.id = None
+            cache.saveData = False
 
 
 # ── Funcion principal ────────────────────────────────────────────────────
@@ -550,43 +716,49 @@ def generate_comisiones_report(entities, output_dir, fx, year=None, month=None):
     os.makedirs(output_dir, exist_ok=True)
     shutil.copy2(COM_PEND_PROV_TEMPLATE_PATH, filepath)
 
-    wb = load_workbook(filepath)
+    # El template no tiene VBA ni vinculos externos
+    wb = load_workbook(filepath, keep_vba=False, keep_links=False, data_only=False, rich_text=False)
 
     # Limpiar hojas innecesarias
     _cleanup_sheets(wb)
+    _register_desglose_styles(wb)
     print(f"  Hojas: {wb.sheetnames}")
 
     # Mapping: data sheet name → number of data rows written
     data_row_counts = {}
+    fx_rows = _build_fx_rows(fx)
+
+    # Carga de CSVs + desglose en paralelo (pandas libera el GIL al parsear);
+    # la escritura con openpyxl se hace despues, en serie.
+    cfgs = list(entities.values())
+    with ThreadPoolExecutor(max_workers=max(len(cfgs), 1)) as ex:
+        prepared = list(ex.map(lambda cfg: _prepare_entity(cfg, fx), cfgs))
 
-    for key, cfg in entities.items():
+    for cfg, entity in zip(cfgs, prepared):
         company = cfg["company"]
-        data_dir = cfg["data_dir"]
         entity_label = _ENTITY_LABELS.get(company, cfg["label"])
 
-        if not os.path.exists(data_dir):
-            print(f"  {entity_label}: directorio no encontrado ({data_dir})")
+        if entity is None:
+            print(f"  {entity_label}: directorio no encontrado ({cfg['data_dir']})")
             continue
 
-        # Cargar datos
-        dreserva_df = _load_filtered_dreserva(data_dir)
-        prov_df = _load_proveedor_df(data_dir)
-        prov_lookup = _build_proveedor_lookup(prov_df)
-        vendedor_lookup = _build_vendedor_lookup(data_dir)
+        dreserva_df = entity["dreserva_df"]
+        prov_df = entity["prov_df"]
+        vendedor_sorted = entity["vendedor_sorted"]
+        desglose_rows = entity["desglose_rows"]
 
         n_rows = len(dreserva_df)
         print(f"  {entity_label}: {n_rows} comisiones pendientes")
 
         # Escribir hoja de datos
         if company == "LLC" and "Data LLC" in wb.sheetnames:
-            _write_data_llc(wb["Data LLC"], dreserva_df, prov_df, vendedor_lookup, fx)
+            _write_data_llc(wb["Data LLC"], dreserva_df, prov_df, vendedor_sorted, fx_rows)
             data_row_counts["Data LLC"] = n_rows
         elif company == "SL" and "Data SL" in wb.sheetnames:
-            _write_data_sl(wb["Data SL"], dreserva_df, prov_df, vendedor_lookup, fx)
+            _write_data_sl(wb["Data SL"], dreserva_df, prov_df, vendedor_sorted, fx_rows)
             data_row_counts["Data SL"] = n_rows
 
         # Desglose por entidad
-        desglose_rows = _build_desglose_rows(dreserva_df, prov_lookup, vendedor_lookup, fx)
         sheet_name = f"Desglose {company}"
         _write_desglose_sheet(wb, sheet_name, entity_label, desglose_rows)
         print(f"  {sheet_name}: {len(desglose_rows)} registros")
@@ -3,12 +3,17 @@ Dashboard de Análisis — genera Dashboard_Insights.xlsx
 con 10 hojas, cada una con tabla resumen + gráfico.
 """
 
-from collections import defaultdict
+import io
+from copy import copy
 
+import numpy as np
+import pandas as pd
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.chart import BarChart, PieChart, LineChart, Reference
 from openpyxl.chart.label import DataLabelList
+from openpyxl.drawing.line import LineProperties
 from openpyxl.utils import get_column_letter
 
 
@@ -17,6 +22,7 @@ TITLE_FONT = Font(name="Arial", bold=True, size=14)
 HDR_FONT = Font(name="Arial", bold=True, size=10, color="FFFFFF")
 HDR_FILL = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
 DATA_FONT = Font(name="Arial", size=10)
+CENTER = Alignment(horizontal="center")
 ALT_FILL = PatternFill(start_color="D6E4F0", end_color="D6E4F0", fill_type="solid")
 BORDER = Border(
     left=Side(style="thin", color="B4C6E7"),
@@ -29,43 +35,146 @@ PCT = '0.0%'
 INT = '#,##0'
 CW = 24   # chart width (cm)
 CH = 15   # chart height (cm)
+THICK_LINE = LineProperties(w=25000, prstDash="solid")  # serie de línea en combos
+
+# Bordes de los rangos de Distribución Rentabilidad (0% va aparte) y de
+# Booking Window (días, intervalos [lo, hi))
+RENT_LABELS = ["<0%", "0%", "0.1-5%", "5-10%", "10-15%", "15-20%", ">20%"]
+RENT_EDGES = np.array([0, 0.05, 0.10, 0.15, 0.20])
+BW_LABELS = ["0-30d", "31-60d", "61-90d", "91-180d", "181-365d", ">365d"]
+BW_EDGES = np.array([0, 31, 61, 91, 181, 366, 99999])
 
 
 # ── Helpers ──────────────────────────────────────────────────────────
 
+def _register_styles(wb):
+    """Título y cabecera como NamedStyle: un solo registro por workbook."""
+    wb.add_named_style(NamedStyle(name="dash_title", font=TITLE_FONT, alignment=CENTER))
+    wb.add_named_style(NamedStyle(name="dash_header", font=HDR_FONT, fill=HDR_FILL,
+                                  alignment=CENTER, border=BORDER))
+
+
 def _sheet(wb, name, title, headers, widths=None):
-    """Create sheet with title + headers. Returns (ws, first_data_row=4)."""
+    """Create sheet with title + headers. Returns (ws, first_data_row=4).
+
+    The workbook is write-only: rows are appended in order, so widths and
+    the title merge are set before the first append.
+    """
     ws = wb.create_sheet(name)
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(headers))
-    ws.cell(1, 1, title).font = TITLE_FONT
-    ws.cell(1, 1).alignment = Alignment(horizontal="center")
-    for c, h in enumerate(headers, 1):
-        cell = ws.cell(3, c, h)
-        cell.font = HDR_FONT
-        cell.fill = HDR_FILL
-        cell.alignment = Alignment(horizontal="center")
-        cell.border = BORDER
     if widths:
         for c, w in enumerate(widths, 1):
             ws.column_dimensions[get_column_letter(c)].width = w
+    ws.merged_cells.add(f"A1:{get_column_letter(len(headers))}1")
+
+    title_cell = WriteOnlyCell(ws, title)
+    title_cell.style = "dash_title"
+    ws.append([title_cell])
+    ws.append([])
+
+    hdr_cells = []
+    for h in headers:
+        cell = WriteOnlyCell(ws, h)
+        cell.style = "dash_header"
+        hdr_cells.append(cell)
+    ws.append(hdr_cells)
     return ws, 4
 
 
+def _data_style(ws, fmt, alt):
+    """StyleArray de una celda de datos (fuente, borde, formato, fila alterna)."""
+    cell = WriteOnlyCell(ws)
+    cell.font = DATA_FONT
+    cell.border = BORDER
+    if fmt:
+        cell.number_format = fmt
+    if alt:
+        cell.fill = ALT_FILL
+    return cell._style
+
+
 def _rows(ws, sr, data, fmts=None):
-    """Write rows with alternating fills. Returns row after last data row."""
+    """Append rows with alternating fills. Returns row after last data row.
+
+    Styles are resolved once per (format, alternate) pair and copied into
+    each cell, instead of four style assignments per cell.
+    """
+    fmts = list(fmts or [])
+    width = max((len(rd) for rd in data), default=0)
+    fmts += [None] * (width - len(fmts))
+    styles = {alt: [_data_style(ws, f, alt) for f in fmts] for alt in (False, True)}
     for i, rd in enumerate(data):
-        r = sr + i
-        for c, val in enumerate(rd, 1):
-            cell = ws.cell(r, c, val)
-            cell.font = DATA_FONT
-            cell.border = BORDER
-            if fmts and c <= len(fmts) and fmts[c - 1]:
-                cell.number_format = fmts[c - 1]
-            if i % 2 == 1:
-                cell.fill = ALT_FILL
+        row_styles = styles[i % 2 == 1]
+        cells = []
+        for val, style in zip(rd, row_styles):
+            cell = WriteOnlyCell(ws, val)
+            cell._style = copy(style)
+            cells.append(cell)
+        ws.append(cells)
     return sr + len(data)
 
 
+def _bin_sums(idx, n_bins, weights=None):
+    """Conteo (o suma de `weights`) por rango; índices fuera de [0, n_bins) se ignoran."""
+    ok = (idx >= 0) & (idx < n_bins)
+    return np.bincount(idx[ok], weights=None if weights is None else weights[ok],
+                       minlength=n_bins)
+
+
+def _top_n(values, n):
+    """Índices de los n mayores valores, en orden descendente y estable ante
+    empates (como sorted(..., reverse=True)[:n]) sin ordenar todo el array."""
+    if len(values) > n:
+        kth = np.partition(values, len(values) - n)[len(values) - n]
+        cand = np.flatnonzero(values >= kth)
+    else:
+        cand = np.arange(len(values))
+    return cand[np.argsort(-values[cand], kind="stable")[:n]]
+
+
+def _group_sums(labels, *values, mean_of=None, sort=False):
+    """Agrupa por `labels` con pd.factorize + np.bincount.
+
+    Orden de grupos como groupby(sort=sort); etiquetas nulas se descartan.
+    Devuelve (keys, n, [suma de cada `values`]) y, si se pasa `mean_of`,
+    además su media por grupo ignorando NaN (0 si el grupo no tiene valores).
+    """
+    codes, keys = pd.factorize(labels, sort=sort)
+    ok = codes >= 0
+    codes, k = codes[ok], len(keys)
+    keys = np.asarray(keys, dtype=object)
+    n = np.bincount(codes, minlength=k)
+    sums = [
+        np.bincount(codes, weights=np.nan_to_num(np.asarray(v, dtype=np.float64)[ok]),
+                    minlength=k)
+        for v in values
+    ]
+    if mean_of is None:
+        return keys, n, sums
+    q = np.asarray(mean_of, dtype=np.float64)[ok]
+    has_q = ~np.isnan(q)
+    q_n = np.bincount(codes[has_q], minlength=k)
+    q_sum = np.bincount(codes[has_q], weights=q[has_q], minlength=k)
+    mean = np.divide(q_sum, q_n, out=np.zeros(k), where=q_n > 0)
+    return keys, n, sums, mean
+
+
+def _refs(ws, dr, end, *cols):
+    """Referencias de gráfico sobre la tabla: la col. 1 son categorías (desde
+    la primera fila de datos), el resto series con la cabecera como título."""
+    return [Reference(ws, min_col=c, min_row=3 if c > 1 else dr, max_row=end - 1)
+            for c in cols]
+
+
+def _label(series, default):
+    """Valores vacíos (None/NaN/"") → etiqueta por defecto, como `x or default`."""
+    return series.where(series.notna() & (series != ""), default)
+
+
+def _thick_line(series):
+    """Línea gruesa para la serie secundaria de los gráficos combinados."""
+    series.graphicalProperties.line = THICK_LINE
+
+
 def _fix_axes(chart, rotate_x=0):
     """Ensure both axes are visible with proper labels."""
     chart.x_axis.delete = False
@@ -90,33 +199,22 @@ def _fix_combo(primary, secondary, rotate_x=0):
 
 # ── Sheet 1: Rendimiento Vendedor ───────────────────────────────────
 
-def _s1(wb, rows):
+def _s1(wb, df):
     hdrs = ["Vendedor", "Total Venta USD", "Rentabilidad USD",
             "% Rent. Prom.", "Nº Cotizaciones", "Ticket Prom. USD"]
     ws, dr = _sheet(wb, "Rendimiento Vendedor",
                     "Rendimiento por Vendedor", hdrs,
                     [25, 18, 18, 15, 16, 18])
 
-    st = defaultdict(lambda: {"usd": 0, "rent": 0, "pcts": [], "n": 0})
-    for r in rows:
-        v = r["G"] or "Sin vendedor"
-        st[v]["usd"] += r["M"] or 0
-        st[v]["rent"] += r["P"] or 0
-        if r["Q"] is not None:
-            st[v]["pcts"].append(r["Q"])
-        st[v]["n"] += 1
-
-    top = sorted(st.items(), key=lambda x: -x[1]["usd"])[:15]
-    tbl = []
-    for v, s in top:
-        ap = sum(s["pcts"]) / len(s["pcts"]) if s["pcts"] else 0
-        tk = s["usd"] / s["n"] if s["n"] else 0
-        tbl.append((v, s["usd"], s["rent"], ap, s["n"], tk))
+    keys, n, (usd, rent), ap = _group_sums(
+        _label(df["G"], "Sin vendedor"), df["M"], df["P"], mean_of=df["Q"])
+    top = _top_n(usd, 15)
+    tbl = list(zip(keys[top], usd[top].tolist(), rent[top].tolist(), ap[top].tolist(),
+                   n[top].tolist(), (usd[top] / n[top]).tolist()))
 
     end = _rows(ws, dr, tbl, [None, USD, USD, PCT, INT, USD])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vals = Reference(ws, min_col=2, min_row=3, max_row=end - 1)
+    cats, vals = _refs(ws, dr, end, 1, 2)
     chart = BarChart()
     chart.type = "bar"
     chart.style = 10
@@ -136,36 +234,31 @@ def _s1(wb, rows):
 
 
 # ── Sheet 2: Evolución Semanal ──────────────────────────────────────
-def _s2(wb, rows):
+def _s2(wb, df):
     hdrs = ["Semana", "Venta USD 2025", "Venta USD 2026",
             "Variación %", "Rent USD 2025", "Rent USD 2026"]
     ws, dr = _sheet(wb, "Evolución Semanal",
                     "Evolución Semanal 2026 vs 2025", hdrs,
                     [12, 18, 18, 14, 18, 18])
 
-    bwy = defaultdict(lambda: defaultdict(lambda: {"usd": 0, "rent": 0}))
-    for r in rows:
-        w, y = r["H"], r["S"]
-        if w and y in (2025, 2026):
-            bwy[w][y]["usd"] += r["M"] or 0
-            bwy[w][y]["rent"] += r["P"] or 0
+    sub = df[(df["H"].fillna(0) != 0) & df["S"].isin((2025, 2026))]
+    bwy = sub.groupby([sub["H"].astype(int), sub["S"].astype(int)])[["M", "P"]].sum()
+    bwy = bwy.unstack("S").reindex(
+        columns=pd.MultiIndex.from_product([["M", "P"], [2025, 2026]])
+    )
+    bwy = bwy[bwy[("M", 2026)].notna()].fillna(0)
 
-    weeks = sorted(w for w in bwy if 2026 in bwy[w])
     tbl = []
-    for w in weeks:
-        v25 = bwy[w][2025]["usd"]
-        v26 = bwy[w][2026]["usd"]
+    for w, v25, v26, r25, r26 in bwy.itertuples(name=None):
         var = (v26 - v25) / v25 if v25 else 0
-        tbl.append((f"S{w}", v25, v26, var, bwy[w][2025]["rent"], bwy[w][2026]["rent"]))
+        tbl.append((f"S{w}", v25, v26, var, r25, r26))
 
     if not tbl:
         return
 
     end = _rows(ws, dr, tbl, [None, USD, USD, PCT, USD, USD])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    v25 = Reference(ws, min_col=2, min_row=3, max_row=end - 1)
-    v26 = Reference(ws, min_col=3, min_row=3, max_row=end - 1)
+    cats, v25, v26, vv = _refs(ws, dr, end, 1, 2, 3, 4)
 
     bar = BarChart()
     bar.type = "col"
@@ -187,7 +280,6 @@ def _s2(wb, rows):
 
     # --- FIX: Right Y-axis for Variación % line ---
     line = LineChart()
-    vv = Reference(ws, min_col=4, min_row=3, max_row=end - 1)
     line.add_data(vv, titles_from_data=True)
 
     line.y_axis.title = "Variación %"
@@ -200,42 +292,37 @@ def _s2(wb, rows):
     bar += line
 
     # Style the line to make it distinct
-    s = bar.series[-1]
-    s.graphicalProperties.line.width = 25000
+    _thick_line(bar.series[-1])
 
     ws.add_chart(bar, f"A{end + 2}")
 
 
 # ── Sheet 3: Distribución Rentabilidad ──────────────────────────────
-def _s3(wb, rows):
+def _s3(wb, df):
     hdrs = ["Rango", "Nº Cotizaciones", "% del Total", "Venta USD Promedio"]
     ws, dr = _sheet(wb, "Distribución Rentabilidad",
                     "Distribución de Rentabilidad", hdrs,
                     [18, 16, 14, 18])
 
-    n_total = len(rows)
-    ranges = [
-        ("<0%", lambda q: q < 0),
-        ("0%", lambda q: q == 0),
-        ("0.1-5%", lambda q: 0 < q <= 0.05),
-        ("5-10%", lambda q: 0.05 < q <= 0.10),
-        ("10-15%", lambda q: 0.10 < q <= 0.15),
-        ("15-20%", lambda q: 0.15 < q <= 0.20),
-        (">20%", lambda q: q > 0.20),
-    ]
+    n_total = len(df)
+    q = df["Q"].to_numpy(dtype=np.float64)
+    m = df["M"].to_numpy(dtype=np.float64)
+
+    # (lo, hi] sobre RENT_EDGES, desplazando +1 todo q >= 0 para separar el 0%
+    idx = np.searchsorted(RENT_EDGES, q, side="left") + (q >= 0)
+    idx[np.isnan(q)] = -1
+    counts = _bin_sums(idx, len(RENT_LABELS)).astype(int)
+    sums = _bin_sums(idx, len(RENT_LABELS), m)
 
     tbl = []
-    for label, cond in ranges:
-        m = [r for r in rows if r["Q"] is not None and cond(r["Q"])]
-        n = len(m)
+    for label, n, s in zip(RENT_LABELS, counts.tolist(), sums.tolist()):
         pct = n / n_total if n_total else 0
-        avg = sum(r["M"] or 0 for r in m) / n if n else 0
+        avg = s / n if n else 0
         tbl.append((label, n, pct, avg))
 
     end = _rows(ws, dr, tbl, [None, INT, PCT, USD])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vc = Reference(ws, min_col=2, min_row=3, max_row=end - 1)
+    cats, vc, va = _refs(ws, dr, end, 1, 2, 4)
 
     bar = BarChart()
     bar.type = "col"
@@ -256,7 +343,6 @@ def _s3(wb, rows):
 
     # --- FIX: Configure the line chart for the RIGHT Y-axis ---
     line = LineChart()
-    va = Reference(ws, min_col=4, min_row=3, max_row=end - 1)
     line.add_data(va, titles_from_data=True)
 
     line.y_axis.title = "Venta USD Promedio"
@@ -274,55 +360,40 @@ def _s3(wb, rows):
     bar += line
 
     # Style the line series so it's clearly distinct
-    s = bar.series[-1]
-    s.graphicalProperties.line.width = 25000  # thicker line
+    _thick_line(bar.series[-1])
 
     ws.add_chart(bar, f"A{end + 2}")
 
 
 # ── Sheet 4: Booking Window ─────────────────────────────────────────
-def _s4(wb, rows):
+def _s4(wb, df):
     hdrs = ["Anticipación", "Nº Cotizaciones", "Venta USD Total",
             "Venta USD Promedio", "Rent % Promedio"]
     ws, dr = _sheet(wb, "Booking Window",
                     "Booking Window — Anticipación de Reserva", hdrs,
                     [18, 16, 18, 18, 15])
 
-    buckets = [
-        ("0-30d", 0, 31),
-        ("31-60d", 31, 61),
-        ("61-90d", 61, 91),
-        ("91-180d", 91, 181),
-        ("181-365d", 181, 366),
-        (">365d", 366, 99999),
-    ]
+    # Días completos entre venta y salida; fechas inválidas → NaT → NaN (sin rango)
+    d = pd.to_datetime(df["D"], errors="coerce").to_numpy("datetime64[ns]")
+    e = pd.to_datetime(df["E"], errors="coerce").to_numpy("datetime64[ns]")
+    diff = np.floor((e - d) / np.timedelta64(1, "D"))
+    idx = np.searchsorted(BW_EDGES, diff, side="right") - 1
+    q = df["Q"].to_numpy(dtype=np.float64)
+    has_q = ~np.isnan(q)
+    n_bins = len(BW_LABELS)
 
-    bd = defaultdict(lambda: {"n": 0, "usd": 0, "pcts": []})
-    for r in rows:
-        if r["E"] and r["D"]:
-            try:
-                diff = (r["E"] - r["D"]).days
-                for label, lo, hi in buckets:
-                    if lo <= diff < hi:
-                        bd[label]["n"] += 1
-                        bd[label]["usd"] += r["M"] or 0
-                        if r["Q"] is not None:
-                            bd[label]["pcts"].append(r["Q"])
-                        break
-            except (TypeError, AttributeError):
-                pass
+    counts = _bin_sums(idx, n_bins).astype(int).tolist()
+    usd = _bin_sums(idx, n_bins, df["M"].to_numpy(dtype=np.float64)).tolist()
+    q_n = _bin_sums(idx[has_q], n_bins).tolist()
+    q_sum = _bin_sums(idx[has_q], n_bins, q[has_q]).tolist()
 
     tbl = []
-    for label, _, _ in buckets:
-        s = bd[label]
-        av = s["usd"] / s["n"] if s["n"] else 0
-        ap = sum(s["pcts"]) / len(s["pcts"]) if s["pcts"] else 0
-        tbl.append((label, s["n"], s["usd"], av, ap))
+    for label, n, u, qn, qs in zip(BW_LABELS, counts, usd, q_n, q_sum):
+        tbl.append((label, n, u, u / n if n else 0, qs / qn if qn else 0))
 
     end = _rows(ws, dr, tbl, [None, INT, USD, USD, PCT])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vu = Reference(ws, min_col=3, min_row=3, max_row=end - 1)
+    cats, vu, vp = _refs(ws, dr, end, 1, 3, 5)
 
     bar = BarChart()
     bar.type = "col"
@@ -343,7 +414,6 @@ def _s4(wb, rows):
 
     # Right Y-axis: Rent %
     line = LineChart()
-    vp = Reference(ws, min_col=5, min_row=3, max_row=end - 1)
     line.add_data(vp, titles_from_data=True)
 
     line.y_axis.title = "Rent %"
@@ -355,14 +425,13 @@ def _s4(wb, rows):
     # Combine
     bar += line
 
-    s = bar.series[-1]
-    s.graphicalProperties.line.width = 25000
+    _thick_line(bar.series[-1])
 
     ws.add_chart(bar, f"A{end + 2}")
 
 # ── Sheet 5: Estacionalidad ─────────────────────────────────────────
 
-def _s5(wb, rows):
+def _s5(wb, df):
     hdrs = ["Mes", "Total Venta USD", "Nº Cotizaciones",
             "Ticket Promedio", "Rent % Promedio"]
     ws, dr = _sheet(wb, "Estacionalidad Mes Salida",
@@ -372,27 +441,22 @@ def _s5(wb, rows):
     months = ["Ene", "Feb", "Mar", "Abr", "May", "Jun",
               "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
 
-    filtered = [r for r in rows if r.get("U") in (2025, 2026)]
-    bm = defaultdict(lambda: {"usd": 0, "n": 0, "pcts": []})
-    for r in filtered:
-        m = r.get("T")
-        if m and 1 <= m <= 12:
-            bm[m]["usd"] += r["M"] or 0
-            bm[m]["n"] += 1
-            if r["Q"] is not None:
-                bm[m]["pcts"].append(r["Q"])
-
-    tbl = []
-    for m in range(1, 13):
-        s = bm[m]
-        tk = s["usd"] / s["n"] if s["n"] else 0
-        ap = sum(s["pcts"]) / len(s["pcts"]) if s["pcts"] else 0
-        tbl.append((months[m - 1], s["usd"], s["n"], tk, ap))
+    sub = df[df["U"].isin((2025, 2026)) & df["T"].between(1, 12)]
+    bm = sub.groupby(sub["T"].astype(int)).agg(
+        usd=("M", "sum"), n=("M", "size"), ap=("Q", "mean"),
+    ).reindex(range(1, 13))
+    bm[["usd", "n"]] = bm[["usd", "n"]].fillna(0)
+    bm["tk"] = (bm["usd"] / bm["n"]).fillna(0)
+    bm["ap"] = bm["ap"].fillna(0)
+
+    tbl = [
+        (months[m - 1], usd, int(n), tk, ap)
+        for m, usd, n, tk, ap in bm[["usd", "n", "tk", "ap"]].itertuples(name=None)
+    ]
 
     end = _rows(ws, dr, tbl, [None, USD, INT, USD, PCT])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vu = Reference(ws, min_col=2, min_row=3, max_row=end - 1)
+    cats, vu, vc = _refs(ws, dr, end, 1, 2, 3)
 
     line = LineChart()
     line.title = "Estacionalidad — Mes de Salida"
@@ -405,7 +469,6 @@ def _s5(wb, rows):
     line.set_categories(cats)
 
     bar = BarChart()
-    vc = Reference(ws, min_col=3, min_row=3, max_row=end - 1)
     bar.add_data(vc, titles_from_data=True)
     bar.y_axis.title = "Nº Cotizaciones"
     bar.y_axis.numFmt = INT
@@ -416,28 +479,21 @@ def _s5(wb, rows):
 
 # ── Sheet 6: Mix Monedas ────────────────────────────────────────────
 
-def _s6(wb, rows):
+def _s6(wb, df):
     hdrs = ["Moneda", "Nº Cotizaciones", "Total Venta USD", "% del Total"]
     ws, dr = _sheet(wb, "Mix Monedas",
                     "Mix de Monedas", hdrs,
                     [14, 16, 18, 14])
 
-    total_usd = sum(r["M"] or 0 for r in rows)
-    bc = defaultdict(lambda: {"n": 0, "usd": 0})
-    for r in rows:
-        cur = r["K"] or "N/A"
-        bc[cur]["n"] += 1
-        bc[cur]["usd"] += r["M"] or 0
-
-    tbl = []
-    for cur, s in sorted(bc.items(), key=lambda x: -x[1]["usd"]):
-        pct = s["usd"] / total_usd if total_usd else 0
-        tbl.append((cur, s["n"], s["usd"], pct))
+    total_usd = df["M"].sum()
+    bc = df.groupby(_label(df["K"], "N/A"), sort=False).agg(n=("M", "size"), usd=("M", "sum"))
+    bc = bc.sort_values("usd", ascending=False, kind="stable")
+    bc["pct"] = bc["usd"] / total_usd if total_usd else 0
+    tbl = list(bc[["n", "usd", "pct"]].itertuples(name=None))
 
     end = _rows(ws, dr, tbl, [None, INT, USD, PCT])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vals = Reference(ws, min_col=3, min_row=3, max_row=end - 1)
+    cats, vals = _refs(ws, dr, end, 1, 3)
 
     pie = PieChart()
     pie.title = "Mix de Monedas"
@@ -465,27 +521,27 @@ def _s7(wb, serv_rows, fx):
                     [18, 18, 18, 15, 14])
 
     main_types = {"HTL", "VLO", "PKT", "TRF", "HPS", "ATR"}
-    bt = defaultdict(lambda: {"sub": 0, "com": 0, "n": 0})
-
-    for r in serv_rows:
-        tipo = str(r.get("I") or "OTR").strip()
-        if tipo not in main_types:
-            tipo = "Otros"
-        moneda = str(r.get("K") or "EUR").strip()
-        fx_usd = fx.get(moneda, fx.get("EUR", {"USD": 1.0})).get("USD", 1.0)
-        bt[tipo]["sub"] += float(r.get("L") or 0) * fx_usd
-        bt[tipo]["com"] += float(r.get("O") or 0) * fx_usd
-        bt[tipo]["n"] += 1
+    sdf = pd.DataFrame(serv_rows, columns=["I", "K", "L", "O"])
+    tipo = _label(sdf["I"], "OTR").astype(str).str.strip()
+    tipo = tipo.where(tipo.isin(main_types), "Otros")
+    moneda = _label(sdf["K"], "EUR").astype(str).str.strip()
+    default_fx = fx.get("EUR", {"USD": 1.0})
+    fx_usd = moneda.map(lambda m: fx.get(m, default_fx).get("USD", 1.0))
+
+    bt = pd.DataFrame({
+        "sub": sdf["L"].fillna(0).astype(float) * fx_usd,
+        "com": sdf["O"].fillna(0).astype(float) * fx_usd,
+    }).groupby(tipo, sort=False).agg(sub=("sub", "sum"), com=("com", "sum"), n=("sub", "size"))
+    bt = bt.sort_values("sub", ascending=False, kind="stable")
 
     tbl = []
-    for tipo, s in sorted(bt.items(), key=lambda x: -x[1]["sub"]):
-        pct = s["com"] / s["sub"] if s["sub"] else 0
-        tbl.append((tipo, round(s["sub"]), round(s["com"]), pct, s["n"]))
+    for t, sub, com, n in bt.itertuples(name=None):
+        pct = com / sub if sub else 0
+        tbl.append((t, round(sub), round(com), pct, n))
 
     end = _rows(ws, dr, tbl, [None, USD, USD, PCT, INT])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vs = Reference(ws, min_col=2, min_row=3, max_row=end - 1)
+    cats, vs, vp = _refs(ws, dr, end, 1, 2, 4)
 
     bar = BarChart()
     bar.type = "col"
@@ -499,7 +555,6 @@ def _s7(wb, serv_rows, fx):
     bar.set_categories(cats)
 
     line = LineChart()
-    vp = Reference(ws, min_col=4, min_row=3, max_row=end - 1)
     line.add_data(vp, titles_from_data=True)
     line.y_axis.title = "% Rentabilidad"
     line.y_axis.numFmt = PCT
@@ -510,29 +565,30 @@ def _s7(wb, serv_rows, fx):
 
 # ── Sheet 8: Concentración Ventas ───────────────────────────────────
 
-def _s8(wb, rows):
+def _s8(wb, df):
     hdrs = ["Folio", "Vendedor", "Venta USD", "% Rentabilidad",
             "Moneda", "Fecha", "% Acumulado"]
     ws, dr = _sheet(wb, "Concentración Ventas",
                     "Concentración de Ventas — Top 20", hdrs,
                     [12, 20, 18, 15, 12, 14, 14])
 
-    total_usd = sum(r["M"] or 0 for r in rows)
-    top20 = sorted(rows, key=lambda r: r["M"] or 0, reverse=True)[:20]
+    m = np.nan_to_num(df["M"].to_numpy(dtype=np.float64))
+    total_usd = float(m.sum())
+    top = _top_n(m, 20)
+    top20 = df.iloc[top]
+    cumul = np.cumsum(m[top])
 
+    cols = zip(top20["B"], _label(top20["G"], ""), top20["M"], top20["Q"].fillna(0),
+               _label(top20["K"], ""), top20["D"], cumul.tolist())
     tbl = []
-    cumul = 0
-    for r in top20:
-        cumul += r["M"] or 0
-        pa = cumul / total_usd if total_usd else 0
-        fs = r["D"].strftime("%Y-%m-%d") if r["D"] else ""
-        tbl.append((r["B"], r["G"] or "", r["M"] or 0, r["Q"] or 0,
-                    r["K"] or "", fs, pa))
+    for b, g, usd, q, k, d, c in cols:
+        pa = c / total_usd if total_usd else 0
+        fs = d.strftime("%Y-%m-%d") if pd.notna(d) else ""
+        tbl.append((b, g, usd, q, k, fs, pa))
 
     end = _rows(ws, dr, tbl, [INT, None, USD, PCT, None, None, PCT])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vu = Reference(ws, min_col=3, min_row=3, max_row=end - 1)
+    cats, vu, va = _refs(ws, dr, end, 1, 3, 7)
 
     bar = BarChart()
     bar.type = "col"
@@ -546,7 +602,6 @@ def _s8(wb, rows):
     bar.set_categories(cats)
 
     line = LineChart()
-    va = Reference(ws, min_col=7, min_row=3, max_row=end - 1)
     line.add_data(va, titles_from_data=True)
     line.y_axis.title = "% Acumulado"
     line.y_axis.numFmt = PCT
@@ -557,34 +612,21 @@ def _s8(wb, rows):
 
 # ── Sheet 9: LLC vs SL ──────────────────────────────────────────────
 
-def _s9(wb, rows):
+def _s9(wb, df):
     hdrs = ["Compañía", "Total Venta USD", "Nº Cotizaciones",
             "Ticket Promedio", "Rent % Promedio", "Rent USD Total"]
     ws, dr = _sheet(wb, "LLC vs SL",
                     "LLC vs SL", hdrs,
                     [14, 18, 16, 18, 15, 18])
 
-    bc = defaultdict(lambda: {"usd": 0, "rent": 0, "n": 0, "pcts": []})
-    for r in rows:
-        c = r["A"]
-        bc[c]["usd"] += r["M"] or 0
-        bc[c]["rent"] += r["P"] or 0
-        bc[c]["n"] += 1
-        if r["Q"] is not None:
-            bc[c]["pcts"].append(r["Q"])
-
-    tbl = []
-    for comp in sorted(bc.keys()):
-        s = bc[comp]
-        tk = s["usd"] / s["n"] if s["n"] else 0
-        ap = sum(s["pcts"]) / len(s["pcts"]) if s["pcts"] else 0
-        tbl.append((comp, s["usd"], s["n"], tk, ap, s["rent"]))
+    keys, n, (usd, rent), ap = _group_sums(df["A"], df["M"], df["P"], mean_of=df["Q"],
+                                           sort=True)
+    tbl = list(zip(keys, usd.tolist(), n.tolist(), (usd / n).tolist(), ap.tolist(),
+                   rent.tolist()))
 
     end = _rows(ws, dr, tbl, [None, USD, INT, USD, PCT, USD])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vu = Reference(ws, min_col=2, min_row=3, max_row=end - 1)
-    vr = Reference(ws, min_col=6, min_row=3, max_row=end - 1)
+    cats, vu, vr = _refs(ws, dr, end, 1, 2, 6)
 
     chart = BarChart()
     chart.type = "col"
@@ -604,35 +646,25 @@ def _s9(wb, rows):
 
 # ── Sheet 10: Tasa Cierre ───────────────────────────────────────────
 
-def _s10(wb, rows):
+def _s10(wb, df):
     hdrs = ["Vendedor", "Total", "Cerradas", "Abiertas",
             "Tasa Cierre %", "Venta USD Cerradas", "Venta USD Abiertas"]
     ws, dr = _sheet(wb, "Tasa Cierre",
                     "Tasa de Cierre por Vendedor", hdrs,
                     [25, 10, 12, 12, 14, 18, 18])
 
-    bv = defaultdict(lambda: {"t": 0, "c": 0, "a": 0, "uc": 0, "ua": 0})
-    for r in rows:
-        v = r["G"] or "Sin vendedor"
-        bv[v]["t"] += 1
-        if r["C"] == 1:
-            bv[v]["c"] += 1
-            bv[v]["uc"] += r["M"] or 0
-        else:
-            bv[v]["a"] += 1
-            bv[v]["ua"] += r["M"] or 0
-
-    top = sorted(bv.items(), key=lambda x: -x[1]["t"])[:15]
-    tbl = []
-    for v, s in top:
-        tc = s["c"] / s["t"] if s["t"] else 0
-        tbl.append((v, s["t"], s["c"], s["a"], tc, s["uc"], s["ua"]))
+    closed = (df["C"] == 1).to_numpy()
+    keys, t, (c, uc, ua) = _group_sums(
+        _label(df["G"], "Sin vendedor"), closed,
+        df["M"].where(closed, 0), df["M"].where(~closed, 0))
+    c = c.astype(np.int64)
+    top = _top_n(t, 15)
+    tbl = list(zip(keys[top], t[top].tolist(), c[top].tolist(), (t - c)[top].tolist(),
+                   (c / t)[top].tolist(), uc[top].tolist(), ua[top].tolist()))
 
     end = _rows(ws, dr, tbl, [None, INT, INT, INT, PCT, USD, USD])
 
-    cats = Reference(ws, min_col=1, min_row=dr, max_row=end - 1)
-    vc = Reference(ws, min_col=3, min_row=3, max_row=end - 1)
-    va = Reference(ws, min_col=4, min_row=3, max_row=end - 1)
+    cats, vc, va, vt = _refs(ws, dr, end, 1, 3, 4, 5)
 
     bar = BarChart()
     bar.type = "col"
@@ -648,7 +680,6 @@ def _s10(wb, rows):
     bar.set_categories(cats)
 
     line = LineChart()
-    vt = Reference(ws, min_col=5, min_row=3, max_row=end - 1)
     line.add_data(vt, titles_from_data=True)
     line.y_axis.title = "Tasa Cierre %"
     line.y_axis.numFmt = PCT
@@ -661,21 +692,30 @@ def _s10(wb, rows):
 
 def generate_dashboard(data_rows, serv_rows, fx, output_path):
     """Generate Dashboard_Insights.xlsx with 10 analysis sheets."""
-    wb = Workbook()
-    wb.remove(wb.active)
-
-    valid = [r for r in data_rows if (r["M"] or 0) > 0]
-
-    _s1(wb, valid)
-    _s2(wb, valid)
-    _s3(wb, valid)
-    _s4(wb, valid)
-    _s5(wb, valid)
-    _s6(wb, valid)
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+
+    # Un solo DataFrame para las agregaciones (groupby en vez de bucles por fila);
+    # solo cotizaciones con venta USD > 0
+    df = pd.DataFrame(data_rows, columns=list("ABCDEGHKMPQSTU")).astype(
+        {"M": float, "P": float, "Q": float}
+    )
+    df = df[df["M"].fillna(0).to_numpy() > 0]
+
+    _s1(wb, df)
+    _s2(wb, df)
+    _s3(wb, df)
+    _s4(wb, df)
+    _s5(wb, df)
+    _s6(wb, df)
     _s7(wb, serv_rows, fx)
-    _s8(wb, valid)
-    _s9(wb, valid)
-    _s10(wb, valid)
+    _s8(wb, df)
+    _s9(wb, df)
+    _s10(wb, df)
 
-    wb.save(output_path)
+    # Serializar en memoria y volcar a disco en una sola escritura
+    buf = io.BytesIO()
+    wb.save(buf)
     wb.close()
+    with open(output_path, "wb") as f:
+        f.write(buf.getbuffer())
@@ -3,31 +3,49 @@ Lectura de CSVs, filtrado y limpieza de datos.
 """
 
 import os
-import glob
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 
+# (data_dir, base_name) -> path resolved by _find_csv
+_csv_paths = {}
+
+
 def _find_csv(data_dir, base_name):
     """Find a CSV file in data_dir, handling variants like 'reserva (1).csv'."""
+    key = (data_dir, base_name)
+    if key in _csv_paths:
+        return _csv_paths[key]
+
     # Try exact name first
     exact = os.path.join(data_dir, f"{base_name}.csv")
     if os.path.exists(exact):
+        _csv_paths[key] = exact
         return exact
 
-    # Try recursive search for any variant
-    pattern = os.path.join(data_dir, "**", f"{base_name}*.csv")
-    matches = glob.glob(pattern, recursive=True)
-    if matches:
-        return matches[0]
+    # Recursive search for any variant (also covers backup subfolders);
+    # stops at the first match instead of walking the whole tree
+    match = next(Path(data_dir).rglob(f"{base_name}*.csv"), None)
+    if match is None:
+        return None
+    _csv_paths[key] = str(match)
+    return _csv_paths[key]
 
-    # Try inside subdirectories (backup folders)
-    pattern = os.path.join(data_dir, "**", f"{base_name}.csv")
-    matches = glob.glob(pattern, recursive=True)
-    if matches:
-        return matches[0]
 
-    return None
+# Columns consumed downstream (DATA/DATA SERV builders, validators, AP&AR).
+# Columns missing from an export are simply skipped.
+RESERVA_COLS = frozenset({
+    "folio", "cancelada", "cerrada", "fecha", "fecha_inicio", "fecha_fin",
+    "vendedor", "usuarios_invitados", "moneda", "total_cliente",
+    "total_proveedor", "observaciones",
+})
+DRESERVA_COLS = frozenset({
+    "folio", "numero", "proveedor", "descripcion", "inicio_estancia",
+    "fin_estancia", "tipo_servicio", "moneda", "subtotal",
+    "monto_comision", "comision_monto",
+})
 
 
 def load_reserva(data_dir):
@@ -37,11 +55,9 @@ def load_reserva(data_dir):
         raise FileNotFoundError(f"No se encuentra reserva.csv en {data_dir}")
 
     print(f"  Leyendo {path}...")
-    df = pd.read_csv(path, encoding="latin-1")
+    df = pd.read_csv(path, encoding="latin-1", usecols=RESERVA_COLS.__contains__)
     total = len(df)
-    df = df[df["cancelada"] == 0].copy()
-    df.sort_values("folio", inplace=True)
-    df.reset_index(drop=True, inplace=True)
+    df = df.query("cancelada == 0").sort_values("folio", ignore_index=True)
     print(f"  {total} registros leídos, {len(df)} después de filtrar canceladas.")
     return df
 
@@ -53,7 +69,7 @@ def load_dreserva(data_dir):
         raise FileNotFoundError(f"No se encuentra dreserva.csv en {data_dir}")
 
     print(f"  Leyendo {path}...")
-    df = pd.read_csv(path, encoding="latin-1")
+    df = pd.read_csv(path, encoding="latin-1", usecols=DRESERVA_COLS.__contains__)
     print(f"  {len(df)} registros de detalle leídos.")
     return df
 
@@ -61,6 +77,11 @@ def load_dreserva(data_dir):
 def compute_rentabilidad(dreserva_df):
     """Sum monto_comision by folio for rentabilidad."""
     col = "monto_comision" if "monto_comision" in dreserva_df.columns else "comision_monto"
-    rent = dreserva_df.groupby("folio")[col].sum().reset_index()
-    rent.columns = ["folio", "rentabilidad"]
-    return rent
+    valid = dreserva_df["folio"].notna()
+    folios, inv = np.unique(dreserva_df.loc[valid, "folio"].to_numpy(), return_inverse=True)
+    sums = np.bincount(
+        inv,
+        weights=dreserva_df.loc[valid, col].fillna(0).to_numpy(dtype=np.float64),
+        minlength=len(folios),
+    )
+    return pd.DataFrame({"folio": folios, "rentabilidad": sums})
@@ -8,19 +8,38 @@ Para fines de semana / festivos usa la tasa del último día laborable anterior.
 """
 
 import calendar
+import json
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
+from operator import itemgetter
 
-from config import FALLBACK_FX
+from config import FALLBACK_FX, FX_CACHE_PATH, FX_MONTHS_CACHE_PATH
 
 # Monedas a pedir (EUR es la base, no se pide)
 _CURRENCIES = "USD,GBP,CHF,JPY,MXN"
 
-# Cache global: {date: {moneda: {EUR: float, USD: float}}}
-_fx_cache = {}
+# Cache global por mes: {(year, month): [(date, {moneda: {EUR, USD}}), ...]}
+# ordenado por fecha (es el único almacén de tasas diarias)
+_fx_cache_by_month = {}
 
 # Meses ya descargados (para no repetir llamadas)
 _downloaded_months = set()
 
+# Meses descargados con éxito → timestamp de la descarga (se persiste en disco)
+_month_fetched = {}
+
+# El mes en curso (o futuro) se vuelve a pedir pasado este tiempo
+_OPEN_MONTH_TTL = 24 * 3600
+
+# Sesión HTTP compartida (keep-alive): se crea al primer uso
+_session = None
+
+# Descargas de meses simultáneas en preload_fx_months
+_MAX_WORKERS = 8
+
 
 # Nombres de mes en español
 _MONTH_NAMES = {
@@ -54,10 +73,10 @@ def get_current_month_daily_rates():
     }
     label = f"{_MONTH_FULL[month]} {year}"
 
-    daily = []
-    for d in sorted(_fx_cache.keys()):
-        if d.year == year and d.month == month:
-            daily.append({"date": d, "rates": _fx_cache[d]})
+    daily = [
+        {"date": d, "rates": rates}
+        for d, rates in _fx_cache_by_month.get((year, month), [])
+    ]
 
     return label, daily
 
@@ -85,10 +104,19 @@ def preload_fx_months(dates):
           f"({sorted_months[0][0]}-{sorted_months[0][1]:02d} a "
           f"{sorted_months[-1][0]}-{sorted_months[-1][1]:02d})...")
 
-    for year, month in sorted_months:
-        _download_month(year, month)
+    # Peticiones independientes: se lanzan en paralelo y se guardan al final
+    _get_session()  # crear la sesión antes de repartirla entre hilos
+    workers = min(_MAX_WORKERS, len(sorted_months))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda ym: _fetch_month(*ym), sorted_months))
+
+    for (year, month), month_rates in zip(sorted_months, results):
+        _store_month(year, month, month_rates)
+    if any(month_rates is not None for month_rates in results):
+        _persist_months_cache()
 
-    print(f"    Cache FX: {len(_fx_cache)} días laborables cargados.")
+    n_days = sum(map(len, _fx_cache_by_month.values()))
+    print(f"    Cache FX: {n_days} días laborables cargados.")
 
 
 def get_historical_fx(target_date):
@@ -108,11 +136,7 @@ def get_historical_fx(target_date):
     if isinstance(target_date, datetime):
         target_date = target_date.date()
 
-    # Asegurar que el mes está descargado
-    month_key = (target_date.year, target_date.month)
-    if month_key not in _downloaded_months:
-        _download_month(target_date.year, target_date.month)
-
+    # _find_nearest_rate descarga el mes (y el anterior) si hace falta
     return _find_nearest_rate(target_date)
 
 
@@ -121,15 +145,22 @@ def get_latest_fx():
     Obtiene tipos de cambio del último día laborable disponible.
     Se usa para la lookup table (AM-AO) y la hoja FX RATES.
     """
+    today = date.today().isoformat()
+    cached = _read_latest_cache()
+    if cached and cached["fetched"] == today:
+        fx = cached["fx"]
+        print(f"  Tipos de cambio (cache {FX_CACHE_PATH}, {cached['date']}).")
+        return fx
+
     try:
-        import requests
-        resp = requests.get(
+        resp = _get_session().get(
             f"https://api.frankfurter.app/latest?from=EUR&to={_CURRENCIES}",
-            timeout=10
+            timeout=5 if cached else 10,
         )
         resp.raise_for_status()
         data = resp.json()
         fx = _parse_single_day(data["rates"])
+        _write_latest_cache({"fetched": today, "date": data.get("date", today), "fx": fx})
 
         print(f"  Tipos de cambio (últimos disponibles, {data.get('date', 'hoy')}):")
         for cur, rates in sorted(fx.items()):
@@ -137,36 +168,149 @@ def get_latest_fx():
         return fx
 
     except Exception as e:
+        if cached:
+            print(f"  ⚠ API latest FX falló ({e}), usando cache del {cached['date']}.")
+            return cached["fx"]
         print(f"  ⚠ API latest FX falló ({e}), usando valores fallback.")
         return FALLBACK_FX.copy()
 
 
 # ── Funciones internas ─────────────────────────────────────────────────
 
-def _download_month(year, month):
-    """Descarga todas las tasas de un mes desde Frankfurter y las cachea."""
+def _get_session():
+    """Sesión requests reutilizada por todas las llamadas a Frankfurter."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=_MAX_WORKERS))
+    return _session
+
+
+def _read_latest_cache():
+    """Lee {fetched, date, fx} de FX_CACHE_PATH; None si no existe o está corrupto."""
+    try:
+        with open(FX_CACHE_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+        return cached if {"fetched", "date", "fx"} <= cached.keys() else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_latest_cache(payload):
+    """Guarda las últimas tasas en disco; un fallo de escritura no es fatal."""
+    try:
+        os.makedirs(os.path.dirname(FX_CACHE_PATH), exist_ok=True)
+        with open(FX_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+    except OSError as e:
+        print(f"    ⚠ No se pudo guardar cache FX ({e})")
+
+
+def _load_months_cache():
+    """Carga en memoria los meses guardados en FX_MONTHS_CACHE_PATH.
+
+    Un mes se da por definitivo solo si se descargó ya cerrado (a partir del
+    día 1 del mes siguiente); si se descargó en curso, aunque ya haya
+    terminado, se usa solo si tiene menos de _OPEN_MONTH_TTL y si no se
+    vuelve a pedir.
+
+    Un cache ilegible o con otra forma se ignora entero, como si no
+    existiera: esto corre al importar el módulo y no debe tumbar los reportes.
+    """
+    now = time.time()
+    try:
+        with open(FX_MONTHS_CACHE_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+        fresh = {}
+        for year, month, ts in cached["months"]:
+            if ts >= _month_end_ts(year, month) or now - ts < _OPEN_MONTH_TTL:
+                fresh[(year, month)] = ts
+        by_month = {key: {} for key in fresh}
+        for date_str, fx in cached["rates"].items():
+            d = date.fromisoformat(date_str)
+            if not isinstance(fx, dict):
+                raise TypeError(f"tasas inválidas para {date_str}")
+            if (d.year, d.month) in by_month:
+                by_month[(d.year, d.month)][d] = fx
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return
+
+    for (year, month), month_rates in by_month.items():
+        _store_month(year, month, month_rates, fetched=fresh[(year, month)])
+
+
+def _month_end_ts(year, month):
+    """Timestamp (hora local) del día 1 del mes siguiente: desde ahí el mes está cerrado."""
+    if month == 12:
+        year, month = year + 1, 1
+    else:
+        month += 1
+    return datetime(year, month, 1).timestamp()
+
+
+def _persist_months_cache():
+    """Guarda los meses descargados con éxito; un fallo de escritura no es fatal."""
+    payload = {
+        "months": [[y, m, ts] for (y, m), ts in sorted(_month_fetched.items())],
+        "rates": {
+            d.isoformat(): fx
+            for key in _month_fetched
+            for d, fx in _fx_cache_by_month.get(key, ())
+        },
+    }
+    try:
+        os.makedirs(os.path.dirname(FX_MONTHS_CACHE_PATH), exist_ok=True)
+        with open(FX_MONTHS_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+    except OSError as e:
+        print(f"    ⚠ No se pudo guardar cache FX mensual ({e})")
+
+
+def _fetch_month(year, month):
+    """Descarga un mes desde Frankfurter → {date: tasas}; None si falla.
+
+    No toca los caches globales, así que puede ejecutarse en paralelo.
+    """
     last_day = calendar.monthrange(year, month)[1]
     start = f"{year}-{month:02d}-01"
     end = f"{year}-{month:02d}-{last_day:02d}"
 
     try:
-        import requests
         url = f"https://api.frankfurter.app/{start}..{end}?from=EUR&to={_CURRENCIES}"
-        resp = requests.get(url, timeout=15)
+        resp = _get_session().get(url, timeout=15)
         resp.raise_for_status()
         data = resp.json()
-
-        for date_str, rates in data.get("rates", {}).items():
-            d = date.fromisoformat(date_str)
-            _fx_cache[d] = _parse_single_day(rates)
+        return {
+            date.fromisoformat(date_str): _parse_single_day(rates)
+            for date_str, rates in data.get("rates", {}).items()
+        }
 
     except Exception as e:
         print(f"    ⚠ FX mes {year}-{month:02d} falló ({e})")
+        return None
+
+
+def _store_month(year, month, month_rates, fetched=None):
+    """Vuelca un mes descargado en los caches (siempre desde el hilo principal)."""
+    if month_rates is not None:
+        _fx_cache_by_month[(year, month)] = sorted(month_rates.items())
+        _month_fetched[(year, month)] = time.time() if fetched is None else fetched
 
     # Marcar como intentado (para no reintentar si falló)
     _downloaded_months.add((year, month))
 
 
+def _download_month(year, month):
+    """Descarga todas las tasas de un mes desde Frankfurter y las cachea."""
+    month_rates = _fetch_month(year, month)
+    _store_month(year, month, month_rates)
+    if month_rates is not None:
+        _persist_months_cache()
+
+
 def _parse_single_day(rates_from_eur):
     """
     Convierte tasas de un día (1 EUR = X moneda) al formato interno
@@ -195,19 +339,25 @@ def _find_nearest_rate(target_date):
     """
     Busca la tasa de target_date. Si no existe (fin de semana/festivo),
     retrocede hasta 7 días buscando el último día laborable con datos.
-    """
-    for i in range(8):
-        d = target_date - timedelta(days=i)
 
-        if d in _fx_cache:
-            return _fx_cache[d]
+    Busca con bisect en la lista ordenada del mes (y, si hace falta, del
+    mes anterior) en vez de probar día a día.
+    """
+    earliest = target_date - timedelta(days=7)
 
-        # Si retrocedemos al mes anterior, asegurar que esté descargado
-        month_key = (d.year, d.month)
+    # Mes de la fecha y, si la ventana de 7 días lo cruza, el mes anterior
+    for month_key in dict.fromkeys([(target_date.year, target_date.month),
+                                    (earliest.year, earliest.month)]):
         if month_key not in _downloaded_months:
-            _download_month(d.year, d.month)
-            if d in _fx_cache:
-                return _fx_cache[d]
+            _download_month(*month_key)
+
+        days = _fx_cache_by_month.get(month_key, [])
+        i = bisect_right(days, target_date, key=itemgetter(0))
+        if i and days[i - 1][0] >= earliest:
+            return days[i - 1][1]
 
     # Si no encontramos nada en 7 días, usar fallback
     return FALLBACK_FX.copy()
+
+
+_load_months_cache()
@@ -8,9 +8,12 @@ Cada TA con reservas en el mes recibe su propio Excel con:
 
 import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
 
 MONTH_NAMES_ES = {
@@ -27,6 +30,9 @@ BOLD = Font(name="Arial", bold=True, size=10)
 NORMAL = Font(name="Arial", size=10)
 HDR_FILL = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
 
+# Mínimo de reportes por proceso para que compense usar el pool
+_TAS_PER_WORKER = 32
+
 # Columnas de la hoja DATA individual
 DATA_COLS = [
     ("A", "Compañia"), ("B", "folio"), ("C", "cerrada"),
@@ -40,6 +46,23 @@ DATA_COLS = [
 ]
 
 
+def _data_col_style(col_letter):
+    """NamedStyle de una columna de la hoja DATA (None = sin formato)."""
+    if col_letter in ("D", "E", "F"):
+        return "data_date"
+    if col_letter in ("J", "L", "M", "N", "O", "P"):
+        return "data_num"
+    if col_letter == "Q":
+        return "data_pct"
+    return None
+
+
+# Resueltos una sola vez: letra y estilo de cada columna DATA, en orden
+DATA_COL_LETTERS = tuple(c for c, _ in DATA_COLS)
+DATA_COL_STYLES = tuple(_data_col_style(c) for c in DATA_COL_LETTERS)
+DATA_STYLED_COLS = tuple((i, st) for i, st in enumerate(DATA_COL_STYLES) if st)
+
+
 def generate_individual_reports(data_rows, output_base_dir, year=2026, month=1):
     """
     Genera un reporte Excel individual por cada TA con reservas en el mes/año dado.
@@ -57,12 +80,17 @@ def generate_individual_reports(data_rows, output_base_dir, year=2026, month=1):
     folder_name = f"Reportes_Individuales_{month_name}_{year}"
     base_dir = os.path.join(output_base_dir, folder_name)
 
-    # Identificar TAs con reservas en el mes/año (por fecha de calendario)
+    # Una sola pasada: TAs con reservas en el mes/año (por fecha de calendario)
+    # y reservas agrupadas por TA (todas / solo del año)
     tas_in_month = set()
+    by_ta = defaultdict(list)
+    by_ta_year = defaultdict(list)
     for r in data_rows:
-        if r.get("R") == month and r.get("S") == year:
-            vend = r.get("G")
-            if vend:
+        vend = r.get("G")
+        by_ta[vend].append(r)
+        if r.get("S") == year:
+            by_ta_year[vend].append(r)
+            if vend and r.get("R") == month:
                 tas_in_month.add(vend)
 
     if not tas_in_month:
@@ -71,184 +99,204 @@ def generate_individual_reports(data_rows, output_base_dir, year=2026, month=1):
 
     print(f"  {len(tas_in_month)} TAs con reservas en {month_name} {year}")
 
-    count = 0
+    # Carpeta por TA (cada TA recibe la suya): rutas y carpetas de una vez
+    filename = f"_{month_name}_{year}.xlsx"
+    ta_paths = {}
     for ta in sorted(tas_in_month):
-        # Todas las reservas del TA (para hoja DATA)
-        ta_all = [r for r in data_rows if r.get("G") == ta]
-
-        # Reservas del TA en el año (para tablas del reporte)
-        ta_year = [r for r in ta_all if r.get("S") == year]
-
-        # Crear carpeta del TA
         ta_dir = os.path.join(base_dir, ta)
         os.makedirs(ta_dir, exist_ok=True)
-        filepath = os.path.join(ta_dir, f"{ta}_{month_name}_{year}.xlsx")
-
-        wb = Workbook()
-        _write_reporte_sheet(wb, ta, ta_year, year)
-        _write_data_sheet(wb, ta_all)
-        wb.save(filepath)
-        wb.close()
-        count += 1
+        ta_paths[ta] = os.path.join(ta_dir, ta + filename)
+
+    jobs = [(ta, filepath, by_ta[ta], by_ta_year[ta], year)
+            for ta, filepath in ta_paths.items()]
+
+    # Cada TA es un workbook independiente: se reparten entre procesos
+    # (la serialización de openpyxl no libera el GIL). Arrancar un proceso
+    # cuesta más que unos pocos reportes, así que solo con bastantes TAs.
+    workers = min(os.cpu_count() or 1, len(jobs) // _TAS_PER_WORKER)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_write_ta_report, *zip(*jobs)))
+    else:
+        for job in jobs:
+            _write_ta_report(*job)
+    count = len(jobs)
 
     print(f"  {count} reportes generados en {base_dir}")
     return count
 
 
-def _write_reporte_sheet(wb, ta_name, ta_year_rows, year):
-    """Escribe la hoja Reporte con las dos tablas."""
-    ws = wb.active
-    ws.title = "Reporte"
+def _write_ta_report(ta, filepath, ta_all, ta_year, year):
+    """Genera y guarda el Excel de un TA. Devuelve la ruta escrita.
 
-    # ── Tabla 1: Venta por mes de salida ──────────────────────────
-    row = 2
-    ws.cell(row, 1, "Venta por mes de salida de viajes").font = BOLD
+    ta_all: todas las reservas del TA (hoja DATA); ta_year: las del año
+    (tablas del reporte). Función de módulo para poder ejecutarse en un
+    proceso del pool.
+    """
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+    _write_reporte_sheet(wb, ta, ta_year, year)
+    _write_data_sheet(wb, ta_all)
+    wb.save(filepath)  # write-only: save ya cierra las hojas, no hace falta close()
+    return filepath
+
+
+def _register_styles(wb):
+    """Registra los NamedStyle del reporte una sola vez por workbook."""
+    for style in (
+        NamedStyle(name="report_hdr", font=BOLD, fill=HDR_FILL),
+        NamedStyle(name="data_date", font=DEFAULT_FONT, number_format=DATE_FMT),
+        NamedStyle(name="data_num", font=DEFAULT_FONT, number_format='#,##0.00'),
+        NamedStyle(name="data_pct", font=DEFAULT_FONT, number_format=PCT_FMT),
+    ):
+        wb.add_named_style(style)
+
+
+def _cell(ws, value, font=None, fmt=None):
+    """WriteOnlyCell con fuente y formato opcionales."""
+    cell = WriteOnlyCell(ws, value)
+    if font:
+        cell.font = font
+    if fmt:
+        cell.number_format = fmt
+    return cell
 
-    row = 3
-    ws.cell(row, 1, "Suma de Total Venta USD").font = BOLD
-    ws.cell(row, 2, str(year)).font = BOLD
 
-    # Agrupar por Mes Inicio donde Año Inicio == year
+def _write_reporte_sheet(wb, ta_name, ta_year_rows, year):
+    """Escribe la hoja Reporte con las dos tablas.
+
+    El workbook es write-only: se agregan primero los datos y después se
+    emiten las filas 1-14 en orden.
+    """
+    ws = wb.create_sheet("Reporte")
+
+    # Una sola pasada: por Mes Inicio (Año Inicio == year) para la tabla 1
+    # y por Mes (Año == year) para la tabla 2
     salida = defaultdict(float)
+    total_salida = 0.0
+    cal_venta = defaultdict(float)
+    cal_rent = defaultdict(float)
+    total_venta_cal = 0.0
+    total_rent_cal = 0.0
     for r in ta_year_rows:
-        if r.get("U") == year and r.get("T") is not None:
-            mes_inicio = int(r["T"])
-            salida[mes_inicio] += float(r.get("M") or 0)
+        en_salida = r.get("U") == year and r.get("T") is not None
+        en_cal = r.get("S") == year and r.get("R") is not None
+        if not (en_salida or en_cal):
+            continue
+        venta = float(r.get("M") or 0)
+        if en_salida:
+            salida[int(r["T"])] += venta
+            total_salida += venta
+        if en_cal:
+            mes = int(r["R"])
+            rent = float(r.get("P") or 0)
+            cal_venta[mes] += venta
+            cal_rent[mes] += rent
+            total_venta_cal += venta
+            total_rent_cal += rent
 
     meses_salida = sorted(salida.keys())
+    col_grand = len(meses_salida) + 3
+
+    meses_cal = sorted(cal_venta.keys())
+    rent_pct = total_rent_cal / total_venta_cal if total_venta_cal > 0 else 0
+
+    # Ajustar anchos (antes de la primera fila en modo write-only)
+    ws.column_dimensions["A"].width = 22
+    for col in range(2, col_grand + 5):
+        ws.column_dimensions[get_column_letter(col)].width = 16
+
+    def hdr(value):
+        cell = WriteOnlyCell(ws, value)
+        cell.style = "report_hdr"
+        return cell
+
+    # ── Tabla 1: Venta por mes de salida ──────────────────────────
+    ws.append([])
+    ws.append([_cell(ws, "Venta por mes de salida de viajes", BOLD)])
+    ws.append([_cell(ws, "Suma de Total Venta USD", BOLD), _cell(ws, str(year), BOLD)])
 
     # Headers
-    row = 4
-    ws.cell(row, 1, "Etiquetas de fila").font = BOLD
-    ws.cell(row, 1).fill = HDR_FILL
-    for ci, mes in enumerate(meses_salida, 2):
-        ws.cell(row, ci, mes).font = BOLD
-        ws.cell(row, ci).fill = HDR_FILL
-    col_total = len(meses_salida) + 2
-    col_grand = col_total + 1
-    ws.cell(row, col_total, f"{year} Total").font = BOLD
-    ws.cell(row, col_total).fill = HDR_FILL
-    ws.cell(row, col_grand, "Grand Total").font = BOLD
-    ws.cell(row, col_grand).fill = HDR_FILL
+    ws.append(
+        [hdr("Etiquetas de fila")]
+        + [hdr(mes) for mes in meses_salida]
+        + [hdr(f"{year} Total"), hdr("Grand Total")]
+    )
 
     # Datos del TA
-    row = 5
-    ws.cell(row, 1, ta_name).font = NORMAL
-    total_salida = 0
-    for ci, mes in enumerate(meses_salida, 2):
-        val = salida[mes]
-        total_salida += val
-        ws.cell(row, ci, val).number_format = USD_FMT
-    ws.cell(row, col_total, total_salida).number_format = USD_FMT
-    ws.cell(row, col_grand, total_salida).number_format = USD_FMT
-    ws.cell(row, col_grand).font = BOLD
+    ws.append(
+        [_cell(ws, ta_name, NORMAL)]
+        + [_cell(ws, salida[mes], fmt=USD_FMT) for mes in meses_salida]
+        + [_cell(ws, total_salida, fmt=USD_FMT),
+           _cell(ws, total_salida, BOLD, fmt=USD_FMT)]
+    )
 
     # Total general
-    row = 6
-    ws.cell(row, 1, "Total general").font = BOLD
-    for ci, mes in enumerate(meses_salida, 2):
-        c = ws.cell(row, ci, salida[mes])
-        c.number_format = USD_FMT
-        c.font = BOLD
-    ws.cell(row, col_total, total_salida).number_format = USD_FMT
-    ws.cell(row, col_total).font = BOLD
+    ws.append(
+        [_cell(ws, "Total general", BOLD)]
+        + [_cell(ws, salida[mes], BOLD, fmt=USD_FMT) for mes in meses_salida]
+        + [_cell(ws, total_salida, BOLD, fmt=USD_FMT)]
+    )
 
     # ── Tabla 2: Venta por mes de calendario ──────────────────────
-    row = 10
-    ws.cell(row, 1, "Venta por mes de calendario").font = BOLD
-
-    row = 11
-    ws.cell(row, 1, "Suma de Total Venta USD").font = BOLD
-    ws.cell(row, 2, str(year)).font = BOLD
-
-    # Agrupar por Mes donde Año == year
-    cal_venta = defaultdict(float)
-    cal_rent = defaultdict(float)
-    for r in ta_year_rows:
-        if r.get("S") == year and r.get("R") is not None:
-            mes = int(r["R"])
-            cal_venta[mes] += float(r.get("M") or 0)
-            cal_rent[mes] += float(r.get("P") or 0)
-
-    meses_cal = sorted(cal_venta.keys())
-    total_venta_cal = sum(cal_venta.values())
-    total_rent_cal = sum(cal_rent.values())
-    rent_pct = total_rent_cal / total_venta_cal if total_venta_cal > 0 else 0
+    for _ in range(3):
+        ws.append([])
+    ws.append([_cell(ws, "Venta por mes de calendario", BOLD)])
+    ws.append([_cell(ws, "Suma de Total Venta USD", BOLD), _cell(ws, str(year), BOLD)])
 
     # Headers
-    row = 12
-    ws.cell(row, 1, "Etiquetas de fila").font = BOLD
-    ws.cell(row, 1).fill = HDR_FILL
-    for ci, mes in enumerate(meses_cal, 2):
-        ws.cell(row, ci, mes).font = BOLD
-        ws.cell(row, ci).fill = HDR_FILL
-    col_t2_total = len(meses_cal) + 2
-    col_t2_grand = col_t2_total + 1
-    col_t2_benef = col_t2_grand + 1
-    col_t2_rent = col_t2_benef + 1
-    for ci, label in [(col_t2_total, f"{year} Total"),
-                       (col_t2_grand, "Grand Total"),
-                       (col_t2_benef, "Beneficio USD"),
-                       (col_t2_rent, "Rentabilidad %")]:
-        ws.cell(row, ci, label).font = BOLD
-        ws.cell(row, ci).fill = HDR_FILL
+    ws.append(
+        [hdr("Etiquetas de fila")]
+        + [hdr(mes) for mes in meses_cal]
+        + [hdr(f"{year} Total"), hdr("Grand Total"),
+           hdr("Beneficio USD"), hdr("Rentabilidad %")]
+    )
 
     # Datos del TA
-    row = 13
-    ws.cell(row, 1, ta_name).font = NORMAL
-    for ci, mes in enumerate(meses_cal, 2):
-        ws.cell(row, ci, cal_venta[mes]).number_format = USD_FMT
-    ws.cell(row, col_t2_total, total_venta_cal).number_format = USD_FMT
-    ws.cell(row, col_t2_total).font = BOLD
-    ws.cell(row, col_t2_grand, total_venta_cal).number_format = USD_FMT
-    ws.cell(row, col_t2_grand).font = BOLD
-    ws.cell(row, col_t2_benef, total_rent_cal).number_format = USD_FMT
-    ws.cell(row, col_t2_rent, rent_pct).number_format = PCT_FMT
+    ws.append(
+        [_cell(ws, ta_name, NORMAL)]
+        + [_cell(ws, cal_venta[mes], fmt=USD_FMT) for mes in meses_cal]
+        + [_cell(ws, total_venta_cal, BOLD, fmt=USD_FMT),
+           _cell(ws, total_venta_cal, BOLD, fmt=USD_FMT),
+           _cell(ws, total_rent_cal, fmt=USD_FMT),
+           _cell(ws, rent_pct, fmt=PCT_FMT)]
+    )
 
     # Total general
-    row = 14
-    ws.cell(row, 1, "Total general").font = BOLD
-    for ci, mes in enumerate(meses_cal, 2):
-        c = ws.cell(row, ci, cal_venta[mes])
-        c.number_format = USD_FMT
-        c.font = BOLD
-    ws.cell(row, col_t2_total, total_venta_cal).number_format = USD_FMT
-    ws.cell(row, col_t2_total).font = BOLD
-
-    # Ajustar anchos
-    ws.column_dimensions["A"].width = 22
-    for col in range(2, col_grand + 5):
-        ws.column_dimensions[get_column_letter(col)].width = 16
+    ws.append(
+        [_cell(ws, "Total general", BOLD)]
+        + [_cell(ws, cal_venta[mes], BOLD, fmt=USD_FMT) for mes in meses_cal]
+        + [_cell(ws, total_venta_cal, BOLD, fmt=USD_FMT)]
+    )
 
 
 def _write_data_sheet(wb, ta_all_rows):
     """Escribe la hoja DATA con todas las reservas del TA."""
     ws = wb.create_sheet("DATA")
 
-    # Headers
-    for ci, (_, header) in enumerate(DATA_COLS, 1):
-        cell = ws.cell(1, ci, header)
-        cell.font = BOLD
-        cell.fill = HDR_FILL
-
-    # Datos
-    for ri, row_data in enumerate(ta_all_rows, 2):
-        for ci, (col_letter, _) in enumerate(DATA_COLS, 1):
-            val = row_data.get(col_letter)
-            if val is not None:
-                cell = ws.cell(ri, ci, val)
-                # Formato por tipo de columna
-                if col_letter in ("D", "E", "F"):
-                    cell.number_format = DATE_FMT
-                elif col_letter in ("J", "L", "M", "N", "O", "P"):
-                    cell.number_format = '#,##0.00'
-                elif col_letter == "Q":
-                    cell.number_format = PCT_FMT
-
-    # Ajustar anchos
+    # Ajustar anchos (antes de la primera fila en modo write-only)
     widths = {"A": 10, "B": 8, "C": 7, "D": 12, "E": 12, "F": 12,
               "G": 14, "H": 8, "I": 10, "J": 14, "K": 8,
               "L": 16, "M": 16, "N": 14, "O": 16, "P": 16,
               "Q": 14, "R": 6, "S": 6, "T": 10, "U": 10}
     for col_letter, w in widths.items():
         ws.column_dimensions[col_letter].width = w
+
+    # Headers
+    hdr_cells = []
+    for _, header in DATA_COLS:
+        cell = WriteOnlyCell(ws, header)
+        cell.style = "report_hdr"
+        hdr_cells.append(cell)
+    ws.append(hdr_cells)
+
+    # Datos: filas posicionales; solo las columnas con formato llevan celda.
+    # Se construye y se vuelca fila a fila (write-only las va escribiendo a disco)
+    for r in ta_all_rows:
+        row = [r.get(c) for c in DATA_COL_LETTERS]
+        for i, style in DATA_STYLED_COLS:
+            if row[i] is not None:
+                cell = WriteOnlyCell(ws, row[i])
+                cell.style = style
+                row[i] = cell
+        ws.append(row)
@@ -10,12 +10,15 @@ Flujo:
 
 import os
 import csv
-import shutil
+import zipfile
 from collections import OrderedDict
+from copy import copy
 from datetime import datetime
 
 from openpyxl import load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
 from openpyxl.workbook.properties import CalcProperties
 
@@ -41,6 +44,9 @@ DATE_FMT = 'DD/MM/YYYY'
 NUM_FMT = '#,##0.00'
 REPORT_NUM_FMT = '[$-409]#,##0'
 
+# Sangrias de las jerarquias (Oficina -> LN -> Vendedor), compartidas por _cell
+_INDENT_ALIGN = {i: Alignment(indent=i, horizontal="left") for i in (1, 2)}
+
 # FX lookup table position: cols AO-AQ (41-43)
 FX_COL_START = 41  # AO
 
@@ -63,6 +69,21 @@ DATA_NEW_COLS = [
     ("AD_fecha_inc", "Fecha Incorporacion"),
 ]
 
+# Formato numerico por clave de DATA NEW (fechas solo si el valor es datetime)
+_DATA_NEW_DATE_KEYS = ("D", "E", "F", "V", "AD_fecha_inc")
+_DATA_NEW_FMTS = {
+    **dict.fromkeys(_DATA_NEW_DATE_KEYS, DATE_FMT),
+    **dict.fromkeys(("J", "L", "M", "N", "O", "P", "AB_renta_com",
+                     "AC_renta_com_usd"), NUM_FMT),
+    "Q": PCT_FMT, "AA_com": PCT_FMT,
+}
+
+# (columna, clave, formato, formato solo si datetime) por columna de DATA NEW
+_DATA_NEW_SPEC = [
+    (ci, key, _DATA_NEW_FMTS.get(key), key in _DATA_NEW_DATE_KEYS)
+    for ci, (key, _) in enumerate(DATA_NEW_COLS, 1)
+]
+
 DATA_NEW_WIDTHS = [10, 8, 7, 12, 12, 12, 14, 8, 10, 14, 8,
                    16, 16, 14, 16, 16, 14, 6, 6, 10, 10,
                    16, 14, 10, 12, 16, 16, 16, 18, 16]
@@ -82,37 +103,74 @@ def _cell(ws, row, col, val, font=FONT, fmt=None, fill=None, border=None,
     if border:
         cell.border = border
     if indent:
-        cell.alignment = Alignment(indent=indent, horizontal="left")
+        cell.alignment = _INDENT_ALIGN.get(indent) or Alignment(
+            indent=indent, horizontal="left")
     elif alignment:
         cell.alignment = alignment
     return cell
 
 
+def _style_ids(ws, font=FONT, fmt=None, border=THIN_BORDER):
+    """StyleArray de referencia con los ids de fuente/borde/formato ya
+    registrados en el workbook de ws."""
+    proto = WriteOnlyCell(ws)
+    proto.font = font
+    proto.border = border
+    if fmt:
+        proto.number_format = fmt
+    return proto._style
+
+
+def _write_styled(ws, row, col, val, ids, fmt_id=None):
+    """Como _cell(..., border=...) pero con ids ya resueltos (_style_ids):
+    fuente y borde de ids, formato solo si se pasa fmt_id."""
+    cell = ws.cell(row, col, val)
+    style = cell._style
+    if style is None:
+        style = cell._style = StyleArray()
+    style.fontId = ids.fontId
+    style.borderId = ids.borderId
+    if fmt_id is not None:
+        style.numFmtId = fmt_id
+    return cell
+
+
 # ── Plantilla Corsario ───────────────────────────────────────────────────
 
+def _parse_plantilla_date(value):
+    """'YYYY-MM-DD' → datetime (acepta mes/dia sin cero, como strptime); None si no es valida."""
+    try:
+        y, m, d = value.split("-")
+        return datetime(int(y), int(m), int(d))
+    except ValueError:
+        return None
+
+
 def load_plantilla_corsario():
     """Carga la Plantilla Corsario desde el CSV en templates/."""
     path = os.path.join(BASE_DIR, "templates", "plantilla_corsario.csv")
     plantilla = []
-    with open(path, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        i_usr, i_ln, i_com, i_ofi, i_fecha = (
+            header.index(c) for c in ("usuario_corsario", "linea_negocio",
+                                      "comisionamiento", "pais_trabajo",
+                                      "fecha_inicio"))
         for row in reader:
-            com = row["comisionamiento"]
+            if not row:
+                continue
+            com = row[i_com]
             try:
                 com = float(com) if com else 0
             except ValueError:
                 com = 0
-            fecha = None
-            if row["fecha_inicio"]:
-                try:
-                    fecha = datetime.strptime(row["fecha_inicio"], "%Y-%m-%d")
-                except ValueError:
-                    pass
+            fecha = _parse_plantilla_date(row[i_fecha]) if row[i_fecha] else None
             plantilla.append({
-                "usuario": row["usuario_corsario"].strip(),
-                "linea_negocio": row["linea_negocio"].strip(),
+                "usuario": row[i_usr].strip(),
+                "linea_negocio": row[i_ln].strip(),
                 "comisionamiento": com,
-                "oficina": row["pais_trabajo"].strip(),
+                "oficina": row[i_ofi].strip(),
                 "fecha_inicio": fecha,
             })
     return plantilla
@@ -176,16 +234,19 @@ def _write_plantilla_block(ws, plantilla, col_start=35, row_start=1):
         _cell(ws, row_start, col_start + i, h,
               font=FONT_HDR, fill=HDR_FILL, border=HDR_BORDER)
 
+    ids = _style_ids(ws)
+    pct_id = _style_ids(ws, fmt=PCT_FMT).numFmtId
+    date_id = _style_ids(ws, fmt=DATE_FMT).numFmtId
     for j, p in enumerate(plantilla):
         r = row_start + 1 + j
-        _cell(ws, r, col_start, p["usuario"], border=THIN_BORDER)
-        _cell(ws, r, col_start + 1, p["linea_negocio"], border=THIN_BORDER)
-        _cell(ws, r, col_start + 2, p["comisionamiento"], fmt=PCT_FMT, border=THIN_BORDER)
-        _cell(ws, r, col_start + 3, p["oficina"], border=THIN_BORDER)
+        _write_styled(ws, r, col_start, p["usuario"], ids)
+        _write_styled(ws, r, col_start + 1, p["linea_negocio"], ids)
+        _write_styled(ws, r, col_start + 2, p["comisionamiento"], ids, pct_id)
+        _write_styled(ws, r, col_start + 3, p["oficina"], ids)
         if p["fecha_inicio"]:
-            _cell(ws, r, col_start + 4, p["fecha_inicio"], fmt=DATE_FMT, border=THIN_BORDER)
+            _write_styled(ws, r, col_start + 4, p["fecha_inicio"], ids, date_id)
         else:
-            _cell(ws, r, col_start + 4, None, border=THIN_BORDER)
+            _write_styled(ws, r, col_start + 4, None, ids)
 
     ws.column_dimensions[get_column_letter(col_start)].width = 15
     ws.column_dimensions[get_column_letter(col_start + 1)].width = 15.5
@@ -205,15 +266,15 @@ def _write_fx_table(ws, fx):
     _cell(ws, 1, FX_COL_START + 2, "FX USD",
           font=FONT_HDR, fill=HDR_FILL, border=HDR_BORDER)
 
+    ids = _style_ids(ws)
+    rate_id = _style_ids(ws, fmt='0.000000').numFmtId
     currencies = ["EUR", "USD", "CHF", "GBP", "GPB", "JPY", "MXN"]
     for i, curr in enumerate(currencies):
         r = 2 + i
-        _cell(ws, r, FX_COL_START, curr, border=THIN_BORDER)
+        _write_styled(ws, r, FX_COL_START, curr, ids)
         if curr in fx:
-            _cell(ws, r, FX_COL_START + 1, fx[curr]["EUR"],
-                  fmt='0.000000', border=THIN_BORDER)
-            _cell(ws, r, FX_COL_START + 2, fx[curr]["USD"],
-                  fmt='0.000000', border=THIN_BORDER)
+            _write_styled(ws, r, FX_COL_START + 1, fx[curr]["EUR"], ids, rate_id)
+            _write_styled(ws, r, FX_COL_START + 2, fx[curr]["USD"], ids, rate_id)
 
     ws.column_dimensions[get_column_letter(FX_COL_START)].width = 10
     ws.column_dimensions[get_column_letter(FX_COL_START + 1)].width = 12
@@ -225,31 +286,33 @@ def _write_fx_table(ws, fx):
 def _write_data_new(ws, enriched, plantilla, fx):
     """Escribe datos enriquecidos en DATA NEW con valores pre-calculados."""
 
-    # Limpiar datos existentes (preservar estructura)
-    for row in range(2, ws.max_row + 1):
-        for col in range(1, len(DATA_NEW_COLS) + 1):
-            ws.cell(row, col).value = None
+    # Limpiar datos existentes (preservar estructura): solo las celdas que
+    # ya existen en el template, sin crear las vacias del rango
+    n_cols = len(DATA_NEW_COLS)
+    for (row, col), cell in ws._cells.items():
+        if row >= 2 and col <= n_cols:
+            cell.value = None
 
     # Verificar/escribir headers
     for ci, (_, header) in enumerate(DATA_NEW_COLS, 1):
         _cell(ws, 1, ci, header, font=FONT_HDR, fill=DATA_NEW_HDR, border=HDR_BORDER)
 
-    # Escribir datos (todos como valores para compatibilidad con pivots)
+    # Escribir datos (todos como valores para compatibilidad con pivots).
+    # Fuente, borde y formato se resuelven a ids una sola vez (_write_styled);
+    # relleno y alineacion del template no se tocan (igual que hacia _cell).
+    ids = _style_ids(ws)
+    fmt_ids = {fmt: _style_ids(ws, fmt=fmt).numFmtId
+               for fmt in set(_DATA_NEW_FMTS.values())}
+    cols = [(ci, key, fmt_ids.get(fmt), date_only)
+            for ci, key, fmt, date_only in _DATA_NEW_SPEC]
+
     for ri, row_data in enumerate(enriched, 2):
-        for ci, (key, _) in enumerate(DATA_NEW_COLS, 1):
+        for ci, key, fmt_id, date_only in cols:
             val = row_data.get(key)
-            if val is not None:
-                fmt = None
-                if key in ("D", "E", "F", "V", "AD_fecha_inc"):
-                    if isinstance(val, datetime):
-                        fmt = DATE_FMT
-                elif key in ("J", "L", "M", "N", "O", "P", "AB_renta_com", "AC_renta_com_usd"):
-                    fmt = NUM_FMT
-                elif key in ("Q", "AA_com"):
-                    fmt = PCT_FMT
-                _cell(ws, ri, ci, val, fmt=fmt, border=THIN_BORDER)
+            if val is None or (date_only and not isinstance(val, datetime)):
+                _write_styled(ws, ri, ci, val, ids)
             else:
-                _cell(ws, ri, ci, None, border=THIN_BORDER)
+                _write_styled(ws, ri, ci, val, ids, fmt_id)
 
     # Anchos
     for i, w in enumerate(DATA_NEW_WIDTHS):
@@ -264,16 +327,15 @@ def _write_data_new(ws, enriched, plantilla, fx):
 
 # ── Report helpers ─────────────────────────────────────────────────────
 
-def _build_fecha_inc_lookup(enriched):
-    """Build {vendor_name: fecha_incorporacion} from enriched data."""
-    lookup = {}
-    for r in enriched:
-        v = str(r.get("G") or "").strip()
-        if v and v not in lookup:
-            fi = r.get("AD_fecha_inc")
-            if fi:
-                lookup[v] = fi
-    return lookup
+def _build_fecha_inc_lookup(plantilla):
+    """Build {vendor_name: fecha_incorporacion} from the Plantilla Corsario.
+
+    Mismo resultado que recorrer enriched (AD_fecha_inc sale de esta misma
+    plantilla), pero en O(|plantilla|) en vez de O(filas).
+    """
+    return {usuario: p["fecha_inicio"]
+            for usuario, p in _build_lookup(plantilla).items()
+            if p["fecha_inicio"]}
 
 
 def _build_hierarchy(rows, value_keys):
@@ -288,12 +350,13 @@ def _build_hierarchy(rows, value_keys):
         vendor = str(r.get("G") or "").strip()
         if not vendor:
             continue
-        tree.setdefault(oficina, {}).setdefault(ln, {}).setdefault(
-            vendor, {k: 0.0 for k in value_keys})
+        acc = tree.setdefault(oficina, {}).setdefault(ln, {}).get(vendor)
+        if acc is None:
+            acc = tree[oficina][ln][vendor] = dict.fromkeys(value_keys, 0.0)
         for k in value_keys:
             val = r.get(k)
             if val is not None:
-                tree[oficina][ln][vendor][k] += float(val)
+                acc[k] += float(val)
 
     hierarchy = OrderedDict()
     grand = {k: 0.0 for k in value_keys}
@@ -378,13 +441,24 @@ def _clear_report_sheet(ws):
     """Clear all cell values and formatting in a report sheet."""
     for merge in list(ws.merged_cells.ranges):
         ws.unmerge_cells(str(merge))
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, max_col=ws.max_column):
-        for cell in row:
-            cell.value = None
-            cell.font = FONT
-            cell.fill = PatternFill()
-            cell.alignment = Alignment()
-            cell.number_format = 'General'
+
+    # Ids de fuente/relleno/alineacion/formato resueltos una vez; solo se
+    # recorren las celdas existentes (las vacias no se crean)
+    proto = WriteOnlyCell(ws)
+    proto.font = FONT
+    proto.fill = PatternFill()
+    proto.alignment = Alignment()
+    proto.number_format = 'General'
+    reset = proto._style
+    for cell in ws._cells.values():
+        cell.value = None
+        style = cell._style
+        if style is None:
+            style = cell._style = StyleArray()
+        style.fontId = reset.fontId
+        style.fillId = reset.fillId
+        style.alignmentId = reset.alignmentId
+        style.numFmtId = reset.numFmtId
 
 
 # ── Report writing functions ─────────────────────────────────────────────
@@ -394,15 +468,35 @@ _REPORT_HEADERS = ["Suma de Total Venta USD", "Suma de Renta after COM USD",
                    "Suma de Rentabilidad en USD"]
 
 
-def _write_report_1_2(ws, enriched, year, month, month_name):
+def _split_summary_rows(enriched, year, month):
+    """Reparte enriched en los subconjuntos de los reports en una sola pasada.
+
+    Returns (mes, ytd, ano_inicio, ano):
+      - mes: Ano == year y Mes == month (Report 1)
+      - ytd: Ano == year y Mes <= month (Report 2)
+      - ano_inicio: Ano Inicio == year (Report 3)
+      - ano: Ano == year (Report 4)
+    """
+    r_mes, r_ytd, r_inicio, r_ano = [], [], [], []
+    for r in enriched:
+        if r.get("U") == year:
+            r_inicio.append(r)
+        if r.get("S") == year:
+            r_ano.append(r)
+            mes = r.get("R")
+            if mes <= month:
+                r_ytd.append(r)
+                if mes == month:
+                    r_mes.append(r)
+    return r_mes, r_ytd, r_inicio, r_ano
+
+
+def _write_report_1_2(ws, r1_data, r2_data, year, month, month_name):
     """Write Reports 1 (current month) and 2 (YTD) side by side.
 
+    r1_data / r2_data: filas del mes y acumuladas del ano (_split_summary_rows).
     Returns next_row after both reports.
     """
-    # Filter data
-    r1_data = [r for r in enriched if r.get("S") == year and r.get("R") == month]
-    r2_data = [r for r in enriched if r.get("S") == year and r.get("R") <= month]
-
     # Build hierarchies
     h1, g1 = _build_hierarchy(r1_data, _REPORT_VALUE_KEYS)
     h2, g2 = _build_hierarchy(r2_data, _REPORT_VALUE_KEYS)
@@ -448,30 +542,37 @@ def _write_report_1_2(ws, enriched, year, month, month_name):
     return max(r1_end, r2_end)
 
 
-def _write_report_3(ws, enriched, year, start_row):
+def _vendor_month_sums(rows, month_key):
+    """Suma Total Venta USD (M) por vendedor y mes (month_key: "T" o "R").
+
+    Returns {vendor: {mes: total}}; se omiten filas sin vendedor o sin mes.
+    """
+    vendor_months = {}
+    for r in rows:
+        vendor = str(r.get("G") or "").strip()
+        mes = r.get(month_key)
+        if not vendor or mes is None:
+            continue
+        mes = int(mes)
+        months = vendor_months.get(vendor)
+        if months is None:
+            months = vendor_months[vendor] = {}
+        months[mes] = months.get(mes, 0.0) + float(r.get("M") or 0)
+    return vendor_months
+
+
+def _write_report_3(ws, filtered, year, start_row):
     """Write Report 3 - Venta por Mes de Inicio.
 
-    Filter: Ano Inicio == year (all bookings with trips starting in year).
+    Filter: Ano Inicio == year (all bookings with trips starting in year),
+    ya aplicado por el llamador.
     Group: Vendor x Mes Inicio.
     Values: sum(Total Venta USD).
 
     Returns next_row.
     """
-    # Filter: Ano Inicio == year
-    filtered = [r for r in enriched if r.get("U") == year]
-
     # Aggregate: vendor x mes_inicio -> sum(M)
-    vendor_months = {}
-    for r in filtered:
-        vendor = str(r.get("G") or "").strip()
-        if not vendor:
-            continue
-        mes = r.get("T")
-        if mes is None:
-            continue
-        mes = int(mes)
-        vendor_months.setdefault(vendor, {})
-        vendor_months[vendor][mes] = vendor_months[vendor].get(mes, 0.0) + float(r.get("M") or 0)
+    vendor_months = _vendor_month_sums(filtered, "T")
 
     # Filter labels
     _cell(ws, start_row, 1, "Compania")
@@ -526,33 +627,19 @@ def _write_report_3(ws, enriched, year, start_row):
     return r
 
 
-def _write_report_4(ws, enriched, year, start_row, fecha_inc_lookup):
+def _write_report_4(ws, filtered, year, start_row, fecha_inc_lookup):
     """Write Report 4 - Venta por Mes with Fecha Incorporacion.
 
-    Filter: Ano == year.
+    Filter: Ano == year, ya aplicado por el llamador.
     Group: Vendor x Mes (calendar month of booking).
     Values: sum(Total Venta USD).
     Col A: Fecha Incorporacion.
 
     Returns next_row.
     """
-    # Filter: Ano == year
-    filtered = [r for r in enriched if r.get("S") == year]
-
     # Aggregate: vendor x mes -> sum(M)
-    vendor_months = {}
-    all_months = set()
-    for r in filtered:
-        vendor = str(r.get("G") or "").strip()
-        if not vendor:
-            continue
-        mes = r.get("R")
-        if mes is None:
-            continue
-        mes = int(mes)
-        all_months.add(mes)
-        vendor_months.setdefault(vendor, {})
-        vendor_months[vendor][mes] = vendor_months[vendor].get(mes, 0.0) + float(r.get("M") or 0)
+    vendor_months = _vendor_month_sums(filtered, "R")
+    all_months = set().union(*vendor_months.values())
 
     months_sorted = sorted(all_months)
     n_months = len(months_sorted)
@@ -654,8 +741,15 @@ def _get_shared_items_mapping(cache, field_idx):
 
     Returns {shared_item_index: numeric_or_string_value}.
     Skips missing (m) and error (e) entries.
+
+    El resultado (y su inverso, ver _get_shared_value_index) se guarda en el
+    propio cacheField: los pivots comparten cache y se consulta varias veces.
     """
     cf = cache.cacheFields[field_idx]
+    mapping = getattr(cf, "_shared_map", None)
+    if mapping is not None:
+        return mapping
+
     si_tree = cf.sharedItems.to_tree()
     mapping = {}
     for si_idx, elem in enumerate(si_tree):
@@ -666,13 +760,20 @@ def _get_shared_items_mapping(cache, field_idx):
             mapping[si_idx] = int(val) if val == int(val) else val
         elif tag == 's' and v is not None:
             mapping[si_idx] = v
+    cf._shared_map = mapping
+    cf._shared_index = {v: k for k, v in mapping.items()}
     return mapping
 
 
+def _get_shared_value_index(cache, field_idx):
+    """Inverso de _get_shared_items_mapping: {valor: shared_item_index}."""
+    _get_shared_items_mapping(cache, field_idx)
+    return cache.cacheFields[field_idx]._shared_index
+
+
 def _get_pf_item_for_value(pt, field_idx, target_value):
     """Find the pivotField item index whose shared value matches target_value."""
-    shared_map = _get_shared_items_mapping(pt.cache, field_idx)
-    val_to_shared = {v: k for k, v in shared_map.items()}
+    val_to_shared = _get_shared_value_index(pt.cache, field_idx)
 
     target_shared = val_to_shared.get(target_value)
     if target_shared is None:
@@ -736,6 +837,14 @@ def _set_axis_items_visible(pt, field_idx, visible_values):
 _TD3_NEW_START = 120
 _TD4_NEW_START = 230
 
+# Rango de cada pivot de la hoja de reportes tras ajustar el layout
+_PIVOT_LOCATIONS = {
+    "TablaDin\u00e1mica1": "A5:D110",
+    "TablaDin\u00e1mica2": "K5:N110",
+    "TablaDin\u00e1mica3": f"A{_TD3_NEW_START}:N{_TD3_NEW_START + 100}",
+    "TablaDin\u00e1mica4": f"B{_TD4_NEW_START}:Z{_TD4_NEW_START + 100}",
+}
+
 
 def _write_plantilla_lookup(ws, plantilla, header_row, data_start_row):
     """Write plantilla corsario in cols AF-AJ for XLOOKUP formulas."""
@@ -754,12 +863,21 @@ def _write_plantilla_lookup(ws, plantilla, header_row, data_start_row):
             c.number_format = DATE_FMT
 
 
+def _clear_values(ws):
+    """Vacia los valores de todas las celdas existentes (conserva estilos).
+
+    Recorre ws._cells en vez de iter_rows sobre max_row x max_column, que
+    crearia una celda por cada coordenada vacia del rango. La hoja no se
+    borra y recrea porque lleva los pivots del template.
+    """
+    for cell in ws._cells.values():
+        cell.value = None
+
+
 def _prepare_report_sheet(ws, plantilla, month, year, month_name):
     """Clear cached pivot data, adjust layout, write labels and formulas."""
     # Clear all cells (cached pivot data + old labels)
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, max_col=ws.max_column):
-        for cell in row:
-            cell.value = None
+    _clear_values(ws)
 
     # Rewrite plantilla lookup in cols AF-AJ (header at row 4, data at row 5)
     _write_plantilla_lookup(ws, plantilla, header_row=4, data_start_row=5)
@@ -797,22 +915,15 @@ def _prepare_report_sheet(ws, plantilla, month, year, month_name):
 
     # Adjust pivot location refs
     for pt in ws._pivots:
-        if pt.name == "TablaDin\u00e1mica1":
-            pt.location.ref = "A5:D110"
-        elif pt.name == "TablaDin\u00e1mica2":
-            pt.location.ref = "K5:N110"
-        elif pt.name == "TablaDin\u00e1mica3":
-            pt.location.ref = f"A{_TD3_NEW_START}:N{_TD3_NEW_START + 100}"
-        elif pt.name == "TablaDin\u00e1mica4":
-            pt.location.ref = f"B{_TD4_NEW_START}:Z{_TD4_NEW_START + 100}"
+        ref = _PIVOT_LOCATIONS.get(pt.name)
+        if ref:
+            pt.location.ref = ref
 
 
 def _prepare_ventas_sheet(ws, plantilla, month, year, month_name):
     """Clear cached pivot data, write labels and formulas for Ventas LN."""
     # Clear all cells
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, max_col=ws.max_column):
-        for cell in row:
-            cell.value = None
+    _clear_values(ws)
 
     # Rewrite plantilla lookup (header at row 2, data at row 3 per template)
     _write_plantilla_lookup(ws, plantilla, header_row=2, data_start_row=3)
@@ -913,6 +1024,30 @@ def _update_pivot_filters(wb, month, year, month_name):
 
 # ── Force pivot refresh (Win + Mac) ──────────────────────────────────────
 
+_PIVOT_RECORDS_PREFIX = "xl/pivotCache/pivotCacheRecords"
+_EMPTY_PIVOT_RECORDS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<pivotCacheRecords xmlns="http://schemas.openxmlformats.org/'
+    b'spreadsheetml/2006/main" count="0"/>'
+)
+
+
+def _copy_template(src, dst):
+    """Copia el template vaciando pivotCacheRecords*.xml en el zip.
+
+    Los registros cacheados se descartan igualmente en _force_pivot_refresh,
+    pero openpyxl los parsea al cargar una vez por cada hoja con pivots
+    (la propiedad pivot_caches no se memoriza): con el template actual eran
+    ~40 s de los ~50 s del reporte. El resto de partes se copia tal cual.
+    """
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w") as zout:
+        for item in zin.infolist():
+            if item.filename.startswith(_PIVOT_RECORDS_PREFIX):
+                zout.writestr(item, _EMPTY_PIVOT_RECORDS)
+            else:
+                zout.writestr(item, zin.read(item.filename))
+
+
 def _force_pivot_refresh(wb, n_data_rows):
     """Fuerza el recalculo de pivot tables y formulas al abrir el archivo.
 
@@ -980,14 +1115,17 @@ def _write_summary_sheet(wb, enriched, year, month, month_name, fecha_inc_lookup
         del wb["SUMMARY"]
     ws = wb.create_sheet("SUMMARY")
 
+    # Filtrar una sola vez para los cuatro reports
+    r_mes, r_ytd, r_inicio, r_ano = _split_summary_rows(enriched, year, month)
+
     # Report 1 (mes actual) + Report 2 (YTD) lado a lado
-    next_row = _write_report_1_2(ws, enriched, year, month, month_name)
+    next_row = _write_report_1_2(ws, r_mes, r_ytd, year, month, month_name)
 
     # Report 3 – Venta por Mes de Inicio
-    next_row = _write_report_3(ws, enriched, year, next_row + 2)
+    next_row = _write_report_3(ws, r_inicio, year, next_row + 2)
 
     # Report 4 – Venta por Mes (con Fecha Incorporacion)
-    next_row = _write_report_4(ws, enriched, year, next_row + 2, fecha_inc_lookup)
+    next_row = _write_report_4(ws, r_ano, year, next_row + 2, fecha_inc_lookup)
 
     # Anchos de columna
     ws.column_dimensions['A'].width = 22
@@ -1030,16 +1168,25 @@ def _write_fx_rates_sheet(wb):
         cell.fill = hdr_fill
         cell.alignment = Alignment(horizontal="center")
 
-    for i, entry in enumerate(daily, 4):
-        ws.cell(i, 1, entry["date"]).number_format = "DD/MM/YYYY"
-        col = 2
+    # Filas diarias (desde la 4) con ws.append: la hoja es nueva y los
+    # formatos se copian de dos prototipos en vez de asignarse celda a celda
+    date_proto = WriteOnlyCell(ws)
+    date_proto.number_format = "DD/MM/YYYY"
+    rate_proto = WriteOnlyCell(ws)
+    rate_proto.number_format = '0.000000'
+
+    def styled(value, proto):
+        cell = WriteOnlyCell(ws, value)
+        cell._style = copy(proto._style)
+        return cell
+
+    for entry in daily:
+        row = [styled(entry["date"], date_proto)]
         for cur in _FX_CURRENCIES:
             rates = entry["rates"].get(cur, {})
-            cell_eur = ws.cell(i, col, rates.get("EUR", 0))
-            cell_usd = ws.cell(i, col + 1, rates.get("USD", 0))
-            cell_eur.number_format = '0.000000'
-            cell_usd.number_format = '0.000000'
-            col += 2
+            row.append(styled(rates.get("EUR", 0), rate_proto))
+            row.append(styled(rates.get("USD", 0), rate_proto))
+        ws.append(row)
 
     return month_label, len(daily)
 
@@ -1109,11 +1256,11 @@ def generate_ta_monthly_report(data_rows, output_dir, fx, year=None, month=None)
     print(f"  Plantilla Corsario: {len(plantilla)} TAs")
     print(f"  Datos enriquecidos: {len(enriched)} filas")
 
-    # Copiar template
+    # Copiar template (sin registros cacheados de los pivots)
     filename = f"Reporte_TAs_{month_name}_{year}.xlsx"
     filepath = os.path.join(output_dir, filename)
     os.makedirs(output_dir, exist_ok=True)
-    shutil.copy2(TA_TEMPLATE_PATH, filepath)
+    _copy_template(TA_TEMPLATE_PATH, filepath)
 
     # Abrir y limpiar hojas innecesarias
     wb = load_workbook(filepath)
@@ -1152,7 +1299,7 @@ def generate_ta_monthly_report(data_rows, output_dir, fx, year=None, month=None)
     print(f"  Force refresh: {n_caches} caches (fullCalcOnLoad + records cleared)")
 
     # Hoja SUMMARY con datos pre-calculados (compatible con Apple Numbers)
-    fecha_inc_lookup = _build_fecha_inc_lookup(enriched)
+    fecha_inc_lookup = _build_fecha_inc_lookup(plantilla)
     _write_summary_sheet(wb, enriched, year, month, month_name, fecha_inc_lookup)
     print(f"  Hoja SUMMARY creada (datos pre-calculados, compatible Numbers)")
 
@@ -2,12 +2,19 @@
 Detección de errores en datos de reservas.
 """
 
+import numpy as np
 import pandas as pd
 
+_MONEDAS_VALIDAS = ("EUR", "USD", "GBP", "GPB", "CHF", "MXN", "JPY")
+
 
 def detect_errors(reserva_df, rentabilidad_df):
     """Detect potential data issues to report.
 
+    Las reglas se evalúan como máscaras sobre columnas completas; solo se
+    recorren en Python las filas con algún error, en orden, para conservar
+    el orden de los mensajes (por fila y, dentro de la fila, por regla).
+
     Returns:
         List of dicts with keys: Folio, Error, Vendedor, Fecha.
     """
@@ -15,14 +22,43 @@ def detect_errors(reserva_df, rentabilidad_df):
 
     merged = reserva_df.merge(rentabilidad_df, on="folio", how="left")
     merged["rentabilidad"] = merged["rentabilidad"].fillna(0)
+    n = len(merged)
+
+    def column(name, default):
+        if name in merged:
+            return merged[name]
+        return pd.Series([default] * n, index=merged.index, dtype=object)
+
+    total = column("total_cliente", 0).astype(float).to_numpy()
+    rent = merged["rentabilidad"].astype(float).to_numpy()
+    moneda = column("moneda", "").astype(object).map(lambda v: str(v).strip())
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = rent / total
+    neg_total = total < 0
+    neg_rent = rent < 0
+    high_rent = (total > 0) & (ratio > 0.5)
+    rent_sin_total = (total == 0) & (rent != 0)
+    bad_moneda = ~moneda.isin(_MONEDAS_VALIDAS).to_numpy()
+    sin_inicio = column("fecha_inicio", None).isna().to_numpy()
+    sin_fin = column("fecha_fin", None).isna().to_numpy()
+
+    flagged = np.flatnonzero(neg_total | neg_rent | high_rent | rent_sin_total
+                             | bad_moneda | sin_inicio | sin_fin)
+    if not len(flagged):
+        return errors
+
+    folios = merged["folio"].tolist()
+    vendedores = column("vendedor", "").tolist()
+    fechas = column("fecha", None).tolist()
+    monedas = moneda.tolist()
 
-    for _, r in merged.iterrows():
-        folio = r["folio"]
-        vendedor = str(r.get("vendedor", "")).strip()
-        fecha = r.get("fecha")
-        total = float(r.get("total_cliente", 0) or 0)
-        rent = float(r.get("rentabilidad", 0) or 0)
-        moneda = str(r.get("moneda", "")).strip()
+    for i in flagged:
+        folio = folios[i]
+        vendedor = str(vendedores[i]).strip()
+        fecha = fechas[i]
+        t = float(total[i])
+        r = float(rent[i])
 
         def add_error(mensaje):
             errors.append({
@@ -32,24 +68,24 @@ def detect_errors(reserva_df, rentabilidad_df):
                 "Fecha": fecha,
             })
 
-        if total < 0:
-            add_error(f"total_cliente negativo ({total})")
+        if neg_total[i]:
+            add_error(f"total_cliente negativo ({t})")
 
-        if rent < 0:
-            add_error(f"rentabilidad negativa ({rent})")
+        if neg_rent[i]:
+            add_error(f"rentabilidad negativa ({r})")
 
-        if total > 0 and (rent / total) > 0.5:
-            add_error(f"rentabilidad muy alta ({rent/total:.1%} de {total})")
+        if high_rent[i]:
+            add_error(f"rentabilidad muy alta ({r/t:.1%} de {t})")
 
-        if total == 0 and rent != 0:
-            add_error(f"total_cliente=0 pero tiene rentabilidad ({rent})")
+        if rent_sin_total[i]:
+            add_error(f"total_cliente=0 pero tiene rentabilidad ({r})")
 
-        if moneda not in ("EUR", "USD", "GBP", "GPB", "CHF", "MXN", "JPY"):
-            add_error(f"moneda desconocida '{moneda}'")
+        if bad_moneda[i]:
+            add_error(f"moneda desconocida '{monedas[i]}'")
 
-        if pd.isna(r.get("fecha_inicio")):
+        if sin_inicio[i]:
             add_error("sin fecha_inicio")
-        if pd.isna(r.get("fecha_fin")):
+        if sin_fin[i]:
             add_error("sin fecha_fin")
 
     return errors
@@ -40,22 +40,31 @@ def build_serv_rows(dreserva_df, reserva_df, company):
 
     col_name = "monto_comision" if "monto_comision" in df.columns else "comision_monto"
 
-    rows = []
-    for _, r in df.iterrows():
-        inicio = _parse_date(r.get("inicio_estancia"))
-        fin = _parse_date(r.get("fin_estancia"))
+    # Columnas opcionales: si faltan en el CSV se usa el valor por defecto
+    defaults = {
+        "folio": None, "proveedor": None, "descripcion": None,
+        "inicio_estancia": None, "fin_estancia": None, "tipo_servicio": None,
+        "moneda": None, "subtotal": 0, col_name: 0,
+    }
+    view = df.reindex(columns=list(defaults))
+    for col, default in defaults.items():
+        if col not in df:
+            view[col] = default
 
+    rows = []
+    for (folio, proveedor, descripcion, inicio, fin, tipo_servicio, moneda,
+         subtotal, comision) in view.itertuples(index=False, name=None):
         row = {
             "B": company,
-            "C": r.get("folio"),
-            "E": r.get("proveedor"),
-            "F": r.get("descripcion"),
-            "G": inicio,
-            "H": fin,
-            "I": r.get("tipo_servicio"),
-            "K": r.get("moneda"),
-            "L": r.get("subtotal", 0),
-            "O": r.get(col_name, 0),
+            "C": folio,
+            "E": proveedor,
+            "F": descripcion,
+            "G": _parse_date(inicio),
+            "H": _parse_date(fin),
+            "I": tipo_servicio,
+            "K": moneda,
+            "L": subtotal,
+            "O": comision,
         }
         rows.append(row)
 
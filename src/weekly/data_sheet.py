@@ -40,15 +40,29 @@ def build_data_rows(reserva_df, rentabilidad_df, company):
     merged = reserva_df.merge(rentabilidad_df, on="folio", how="left")
     merged["rentabilidad"] = merged["rentabilidad"].fillna(0)
 
+    # Columnas opcionales: si faltan en el CSV se usa el valor por defecto
+    defaults = {
+        "folio": None, "cerrada": 0, "fecha": None, "fecha_inicio": None,
+        "fecha_fin": None, "vendedor": None, "usuarios_invitados": None,
+        "moneda": "EUR", "total_cliente": 0, "rentabilidad": 0,
+        "observaciones": "",
+    }
+    view = merged.reindex(columns=list(defaults))
+    for col, default in defaults.items():
+        if col not in merged:
+            view[col] = default
+
     rows = []
-    for _, r in merged.iterrows():
-        fecha = _parse_date(r.get("fecha"))
-        fecha_inicio = _parse_date(r.get("fecha_inicio"))
-        fecha_fin = _parse_date(r.get("fecha_fin"))
+    for (folio, cerrada, fecha, fecha_inicio, fecha_fin, vendedor,
+         usuarios_invitados, moneda, total_cliente, rentabilidad,
+         observaciones) in view.itertuples(index=False, name=None):
+        fecha = _parse_date(fecha)
+        fecha_inicio = _parse_date(fecha_inicio)
+        fecha_fin = _parse_date(fecha_fin)
 
-        moneda = str(r.get("moneda", "EUR")).strip()
-        total_cliente = float(r.get("total_cliente", 0) or 0)
-        rentabilidad = float(r.get("rentabilidad", 0) or 0)
+        moneda = str(moneda).strip()
+        total_cliente = float(total_cliente or 0)
+        rentabilidad = float(rentabilidad or 0)
 
         # Tipo de cambio histórico del día de la reserva
         fx = get_historical_fx(fecha)
@@ -63,14 +77,14 @@ def build_data_rows(reserva_df, rentabilidad_df, company):
 
         row = {
             "A": company,
-            "B": r.get("folio"),
-            "C": r.get("cerrada", 0),
+            "B": folio,
+            "C": cerrada,
             "D": fecha,
             "E": fecha_inicio,
             "F": fecha_fin,
-            "G": r.get("vendedor"),
+            "G": vendedor,
             "H": semana,
-            "I": r.get("usuarios_invitados"),
+            "I": usuarios_invitados,
             "J": total_cliente,
             "K": moneda,
             "L": round(total_cliente * fx_eur, 2),
@@ -86,7 +100,7 @@ def build_data_rows(reserva_df, rentabilidad_df, company):
             "V": fecha_45,
             "W": mes_45_nombre,
             "X": fecha_45.year if fecha_45 else None,
-            "Z": r.get("observaciones", ""),
+            "Z": observaciones,
         }
         rows.append(row)
 